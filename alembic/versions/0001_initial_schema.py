@@ -0,0 +1,61 @@
+"""initial schema
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _existing_tables() -> set:
+    # Offline (--sql) there's no database to look at
+    if op.get_context().as_sql:
+        return set()
+    return set(sa.inspect(op.get_bind()).get_table_names())
+
+
+def upgrade() -> None:
+    # The schema the app created with create_all before migrations existed.
+    # Such databases already have these tables and pick up from here.
+    existing = _existing_tables()
+    if 'triggers' not in existing:
+        op.create_table(
+            'triggers',
+            sa.Column('id', sa.Uuid(), primary_key=True),
+            sa.Column('type', sa.String(), nullable=False),
+            sa.Column('schedule', sa.String(), nullable=True),
+            sa.Column('api_schema', sa.JSON(), nullable=True),
+            sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column('is_active', sa.Boolean(), nullable=True),
+            sa.Column('recurring', sa.Boolean(), nullable=True),
+            sa.Column('recurring_pattern', sa.String(), nullable=True),
+            sa.Column('api_endpoint', sa.String(), nullable=True),
+            sa.Column('api_method', sa.String(), nullable=True),
+            sa.CheckConstraint("type IN ('scheduled', 'api')", name='check_trigger_type'),
+        )
+    if 'events' not in existing:
+        op.create_table(
+            'events',
+            sa.Column('id', sa.Uuid(), primary_key=True),
+            sa.Column('trigger_id', sa.Uuid(), sa.ForeignKey('triggers.id'), nullable=True),
+            sa.Column('payload', sa.JSON(), nullable=True),
+            sa.Column('triggered_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column('status', sa.String(), nullable=True),
+            sa.Column('is_test', sa.Boolean(), nullable=True),
+        )
+
+
+def downgrade() -> None:
+    op.drop_table('events')
+    op.drop_table('triggers')
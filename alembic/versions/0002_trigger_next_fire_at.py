@@ -0,0 +1,64 @@
+"""add triggers.next_fire_at index
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from datetime import datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from croniter import croniter
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _next_fire_at(row, now):
+    # A frozen copy of the app's next_fire_time as of this revision, so later
+    # changes to the app don't alter what this migration writes
+    if row.recurring and row.recurring_pattern:
+        return croniter(row.recurring_pattern, now).get_next(datetime)
+    if row.schedule:
+        try:
+            run_date = datetime.fromisoformat(row.schedule.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+        if run_date.tzinfo is None:
+            run_date = run_date.replace(tzinfo=timezone.utc)
+        return run_date if run_date > now else None
+    return None
+
+
+def upgrade() -> None:
+    op.add_column('triggers', sa.Column('next_fire_at', sa.DateTime(timezone=True), nullable=True))
+    op.create_index('ix_triggers_next_fire_at', 'triggers', ['next_fire_at'])
+
+    # Backfill existing scheduled triggers
+    triggers = sa.table(
+        'triggers',
+        sa.column('id'),
+        sa.column('type'),
+        sa.column('schedule'),
+        sa.column('recurring'),
+        sa.column('recurring_pattern'),
+        sa.column('next_fire_at', sa.DateTime(timezone=True)),
+    )
+    connection = op.get_bind()
+    rows = connection.execute(sa.select(triggers).where(triggers.c.type == 'scheduled')).all()
+    now = datetime.now(timezone.utc)
+    for row in rows:
+        connection.execute(
+            triggers.update().where(triggers.c.id == row.id).values(next_fire_at=_next_fire_at(row, now))
+        )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_triggers_next_fire_at', table_name='triggers')
+    op.drop_column('triggers', 'next_fire_at')
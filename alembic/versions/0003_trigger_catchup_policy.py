@@ -0,0 +1,36 @@
+"""add triggers.catchup_policy
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Batch mode lets SQLite, which can't ALTER in a constraint, rebuild the table
+    with op.batch_alter_table('triggers') as batch_op:
+        batch_op.add_column(
+            sa.Column('catchup_policy', sa.String(), nullable=False, server_default='skip')
+        )
+        batch_op.create_check_constraint(
+            'check_trigger_catchup_policy',
+            "catchup_policy IN ('skip', 'coalesce', 'backfill')"
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('triggers') as batch_op:
+        batch_op.drop_constraint('check_trigger_catchup_policy', type_='check')
+        batch_op.drop_column('catchup_policy')
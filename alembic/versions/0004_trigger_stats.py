@@ -0,0 +1,34 @@
+"""add trigger_stats checkpoints
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'trigger_stats',
+        sa.Column('trigger_id', sa.Uuid(), primary_key=True),
+        sa.Column('node_id', sa.String(), primary_key=True),
+        sa.Column('stats', sa.JSON(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    op.create_index('ix_trigger_stats_updated_at', 'trigger_stats', ['updated_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_trigger_stats_updated_at', table_name='trigger_stats')
+    op.drop_table('trigger_stats')
@@ -0,0 +1,86 @@
+"""derive event status from triggered_at
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Rows rewritten per statement. Each batch commits on its own, so locks are
+# short-lived and no single transaction has to hold every events row.
+BATCH_SIZE = 5000
+
+events = sa.table(
+    'events',
+    sa.column('id'),
+    sa.column('status', sa.String),
+    sa.column('triggered_at', sa.DateTime(timezone=True)),
+)
+
+
+def _update_in_batches(condition, **values) -> None:
+    """Set values on the events matching condition, BATCH_SIZE rows at a time
+
+    condition must stop matching a row once it's updated. Offline (--sql)
+    there are no row counts to loop on, so one UPDATE is emitted instead.
+    """
+    if op.get_context().as_sql:
+        op.execute(events.update().where(condition).values(**values))
+        return
+    batch = events.update().where(
+        events.c.id.in_(sa.select(events.c.id).where(condition).limit(BATCH_SIZE))
+    ).values(**values)
+    bind = op.get_bind()
+    while bind.execute(batch).rowcount:
+        pass
+
+
+def upgrade() -> None:
+    # CONCURRENTLY keeps event inserts flowing on Postgres while the indexes
+    # build, and can't run inside a transaction; the autocommit block also
+    # commits every batch of the status rewrite separately
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_events_triggered_at', 'events', ['triggered_at'],
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+        # active/archived are derived from triggered_at now; only overrides
+        # stay. There's no server default to drop, the old default was
+        # client side.
+        _update_in_batches(events.c.status.in_(('active', 'archived')), status=None)
+        # Built after the rewrite, so it only ever covers the overrides
+        op.create_index(
+            'ix_events_status_override', 'events', ['status'],
+            postgresql_where=sa.text('status IS NOT NULL'),
+            sqlite_where=sa.text('status IS NOT NULL'),
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    # Materialize the derived status again for the archive sweep. The archive
+    # window comes from the environment, not the live app settings, with the
+    # same default
+    archive_hours = int(os.environ.get('EVENT_ARCHIVE_HOURS', '2'))
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=archive_hours)
+    with op.get_context().autocommit_block():
+        _update_in_batches(
+            events.c.status.is_(None),
+            status=sa.case((events.c.triggered_at <= cutoff, 'archived'), else_='active'),
+        )
+        op.drop_index('ix_events_status_override', table_name='events', postgresql_concurrently=True)
+        op.drop_index('ix_events_triggered_at', table_name='events', postgresql_concurrently=True)
@@ -0,0 +1,37 @@
+"""add event_outbox
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Earlier versions of 0001 created this table too; those databases keep it
+    if not op.get_context().as_sql and sa.inspect(op.get_bind()).has_table('event_outbox'):
+        return
+    op.create_table(
+        'event_outbox',
+        sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), primary_key=True, autoincrement=True),
+        sa.Column('event_id', sa.Uuid(), nullable=False),
+        sa.Column('trigger_id', sa.Uuid(), nullable=False),
+        sa.Column('stream', sa.String(), nullable=False),
+        sa.Column('payload', sa.JSON(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('event_outbox')
@@ -1,14 +1,19 @@
 from fastapi import APIRouter, Depends, HTTPException, Request, Query
 from sqlalchemy.orm import Session
 from typing import List
+import uuid
 from croniter import croniter
 from apscheduler.jobstores.base import JobLookupError
 from ...core.database import get_db
-from ...schemas.trigger import TriggerCreate, Trigger
+from ...schemas.trigger import TriggerCreate, Trigger, UpcomingFirings, FiringStats
 from ...schemas.event import EventCreate
 from ...models.trigger import Trigger as TriggerModel
 from ...services.scheduler import scheduler
 from ...services.event_manager import create_event, create_event_from_trigger
+from ...services.firing_stats import get_firing_stats
+from ...services.job_queue import enqueue, notify_scheduler
+from ...services.schedule_index import next_fire_time, upcoming_firings
+from ...core.config import settings
 from ...core.security import get_current_user
 from ...schemas.user import User
 
@@ -41,6 +46,7 @@ async def create_trigger(
             raise HTTPException(status_code=400, detail="API schema must specify required_fields")
 
     db_trigger = TriggerModel(**trigger.dict())
+    db_trigger.next_fire_at = next_fire_time(db_trigger)
     db.add(db_trigger)
     db.commit()
     db.refresh(db_trigger)
@@ -80,6 +86,8 @@ async def create_trigger(
             db.commit()
             raise HTTPException(status_code=500, detail=f"Failed to schedule trigger: {str(e)}")
     
+    if trigger.type == "scheduled":
+        await notify_scheduler()
     return db_trigger
 
 
@@ -103,6 +111,27 @@ async def list_triggers(
     triggers = query.order_by(TriggerModel.created_at.desc()).all()
     return triggers
 
+@router.get("/upcoming", response_model=UpcomingFirings)
+async def list_upcoming_firings(
+    window: int = Query(60, ge=1, le=1440, description="Minutes to look ahead"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Per-minute fire counts of scheduled triggers over the next `window` minutes"""
+    return upcoming_firings(db, window_minutes=window)
+
+@router.get("/{trigger_id}/stats", response_model=FiringStats)
+async def get_trigger_stats(
+    trigger_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Firing rates, inter-arrival times and schedule delay, merged across nodes"""
+    trigger = db.query(TriggerModel).filter(TriggerModel.id == trigger_id).first()
+    if not trigger:
+        raise HTTPException(status_code=404, detail="Trigger not found")
+    return get_firing_stats(db, trigger.id)
+
 @router.put("/{trigger_id}", response_model=Trigger)
 async def update_trigger(
     trigger_id: str, 
@@ -137,13 +166,11 @@ async def update_trigger(
                 # Log the error but continue if job doesn't exist
                 print(f"Error removing old job: {e}")
         
-        # Begin transaction
-        db.begin()
-        
         # Update trigger fields
         update_data = trigger.dict(exclude_unset=True)
         for key, value in update_data.items():
             setattr(db_trigger, key, value)
+        db_trigger.next_fire_at = next_fire_time(db_trigger)
         
         # Add new schedule if needed
         if trigger.type == "scheduled":
@@ -175,6 +202,8 @@ async def update_trigger(
         
         db.commit()
         db.refresh(db_trigger)
+        if trigger.type == "scheduled":
+            await notify_scheduler()
         return db_trigger
         
     except HTTPException:
@@ -214,6 +243,12 @@ async def test_trigger(
     if not trigger:
         raise HTTPException(status_code=404, detail="Trigger not found")
     
+    # Hand the firing to a worker when this process doesn't run the scheduler
+    if not settings.RUN_SCHEDULER:
+        event_id = uuid.uuid4()
+        await enqueue("fire_trigger", trigger_id=str(trigger.id), event_id=str(event_id), is_test=True)
+        return {"message": "Test trigger queued", "event_id": event_id}
+
     # Create test event
     event = await create_event(db, EventCreate(
         trigger_id=trigger.id,
@@ -1,8 +1,22 @@
+import asyncio
+import time
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
 from datetime import datetime
+from sqlalchemy import text
+from ...core.cache import cache_stats, get_redis
+from ...core.config import settings
+from ...core.database import engine
+from ...services.scheduler import scheduler_hydrated
 
 router = APIRouter()
 
+CHECK_TIMEOUT_SECONDS = 2.0
+
+# Last readiness result, shared by every probe within READINESS_CACHE_SECONDS
+_readiness = {"checked_at": 0.0, "result": None}
+_readiness_lock = asyncio.Lock()
+
 @router.get("/health")
 async def health_check():
     return {
@@ -10,3 +24,53 @@ async def health_check():
         "timestamp": datetime.utcnow().isoformat(),
         "service": "event-trigger-platform"
     }
+
+def _check_database():
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+
+async def _run_check(check) -> str:
+    try:
+        await asyncio.wait_for(check, timeout=CHECK_TIMEOUT_SECONDS)
+        return "ok"
+    except Exception as e:
+        return f"error: {e.__class__.__name__}"
+
+async def _check_redis():
+    redis_client = get_redis()
+    if redis_client is None:
+        return "disabled"
+    return await _run_check(redis_client.ping())
+
+async def _readiness_checks() -> dict:
+    database, redis = await asyncio.gather(
+        _run_check(asyncio.to_thread(_check_database)),
+        _check_redis()
+    )
+    return {
+        "database": database,
+        "redis": redis,
+        "scheduler": "ok" if scheduler_hydrated.is_set() else "hydrating"
+    }
+
+@router.get("/ready")
+async def readiness_check():
+    async with _readiness_lock:
+        if time.monotonic() - _readiness["checked_at"] >= settings.READINESS_CACHE_SECONDS:
+            _readiness["result"] = await _readiness_checks()
+            _readiness["checked_at"] = time.monotonic()
+        checks = _readiness["result"]
+
+    ready = all(state in ("ok", "disabled") for state in checks.values())
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": "ready" if ready else "not_ready",
+            "timestamp": datetime.utcnow().isoformat(),
+            "checks": checks
+        }
+    )
+
+@router.get("/cache/stats")
+async def cache_statistics():
+    return cache_stats()
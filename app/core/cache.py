@@ -1,15 +1,267 @@
-from redis import Redis
-from ..core.config import settings
+"""Async two-tier cache: an in-process LRU in front of Redis.
+
+All Redis traffic goes through one asyncio client backed by a blocking
+connection pool, so cache calls never stall the event loop and concurrent
+requests share connections. Other Redis users in the process (the job queue,
+readiness checks) borrow the same client through ``get_redis()``.
+
+- ``CACHE_L1_MAXSIZE`` > 0 keeps hot keys in process for ``CACHE_L1_TTL``
+  seconds. L1 entries are not invalidated across processes, so keep the TTL
+  short
+- ``get_many``/``set_many`` use a single ``MGET``/pipeline round trip
+- ``get_or_set`` de-duplicates concurrent misses on a key in this process,
+  so the loader runs once and every waiter gets its result. If the loader
+  fails, waiters get its exception; if the caller running it is cancelled,
+  a waiter runs the loader again
+- TTLs are jittered by ``CACHE_TTL_JITTER`` so keys written together don't
+  expire together
+- ``CACHE_SERIALIZER`` picks ``json`` (default), ``orjson`` or ``msgpack``
+
+Values from the in-process tier (and from a shared ``get_or_set`` load) are
+the cached objects themselves, not copies, so callers must not mutate them.
+
+Redis errors degrade to cache misses and are counted in ``cache_stats()``.
+With ``REDIS_URL=memory://`` there is no Redis tier at all: the in-process
+LRU holds entries for their full TTL and ``get_redis()`` returns None.
+"""
+import asyncio
 import json
+import logging
+import random
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+from redis.asyncio import BlockingConnectionPool, Redis
+from redis.exceptions import RedisError
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+def _json_dumps(value) -> bytes:
+    return json.dumps(value).encode()
+
+def _load_serializer(name: str):
+    if name == "orjson":
+        try:
+            import orjson
+            return orjson.dumps, orjson.loads
+        except ImportError:
+            logger.warning("orjson is not installed, falling back to json cache serialization")
+    elif name == "msgpack":
+        try:
+            import msgpack
+            return msgpack.packb, msgpack.unpackb
+        except ImportError:
+            logger.warning("msgpack is not installed, falling back to json cache serialization")
+    return _json_dumps, json.loads
+
+_dumps, _loads = _load_serializer(settings.CACHE_SERIALIZER)
+
+redis_client = None
+if settings.REDIS_ENABLED:
+    pool = BlockingConnectionPool.from_url(
+        settings.REDIS_URL,
+        max_connections=settings.REDIS_MAX_CONNECTIONS,
+        timeout=settings.REDIS_POOL_TIMEOUT
+    )
+    redis_client = Redis(connection_pool=pool)
+
+def get_redis() -> Optional[Redis]:
+    return redis_client
+
+class LocalCache:
+    """Size-bounded LRU with per-entry expiry"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+
+    def get(self, key: str):
+        """The cached object itself, not a copy: don't mutate it"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
 
-redis_client = Redis.from_url(settings.REDIS_URL, decode_responses=True)
+    def set(self, key: str, value, ttl: float = None):
+        if self.maxsize <= 0:
+            return
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+if settings.REDIS_ENABLED:
+    local_cache = LocalCache(settings.CACHE_L1_MAXSIZE, settings.CACHE_L1_TTL)
+else:
+    local_cache = LocalCache(settings.CACHE_L1_MAXSIZE or 10000, float("inf"))
+
+_stats = {
+    "l1_hits": 0,
+    "hits": 0,
+    "misses": 0,
+    "errors": 0,
+    "redis_calls": 0,
+    "redis_seconds": 0.0,
+    "single_flight_waits": 0,
+}
+
+def cache_stats() -> dict:
+    """Counters since process start, with mean Redis latency in milliseconds"""
+    calls = _stats["redis_calls"]
+    return {
+        **_stats,
+        "redis_mean_ms": (_stats["redis_seconds"] / calls * 1000) if calls else 0.0,
+    }
+
+def jittered(expire: int) -> int:
+    """Spread expiry by +/- CACHE_TTL_JITTER so batches don't expire at once"""
+    spread = int(expire * settings.CACHE_TTL_JITTER)
+    return max(1, expire + random.randint(-spread, spread)) if spread else expire
+
+async def _timed(call: Awaitable):
+    started = time.perf_counter()
+    try:
+        return await call
+    finally:
+        _stats["redis_calls"] += 1
+        _stats["redis_seconds"] += time.perf_counter() - started
 
 async def cache_get(key: str):
-    data = redis_client.get(key)
-    return json.loads(data) if data else None
+    value = local_cache.get(key)
+    if value is not None:
+        _stats["l1_hits"] += 1
+        return value
+    if redis_client is None:
+        _stats["misses"] += 1
+        return None
+    try:
+        data = await _timed(redis_client.get(key))
+    except RedisError as e:
+        _stats["errors"] += 1
+        logger.warning("Cache get failed for %s: %s", key, e)
+        return None
+    if data is None:
+        _stats["misses"] += 1
+        return None
+    _stats["hits"] += 1
+    value = _loads(data)
+    local_cache.set(key, value)
+    return value
 
-async def cache_set(key: str, value: dict, expire: int = 3600):
-    redis_client.setex(key, expire, json.dumps(value))
+async def cache_set(key: str, value: Any, expire: int = 3600):
+    local_cache.set(key, value, expire)
+    if redis_client is None:
+        return
+    try:
+        await _timed(redis_client.set(key, _dumps(value), ex=jittered(expire)))
+    except RedisError as e:
+        _stats["errors"] += 1
+        logger.warning("Cache set failed for %s: %s", key, e)
 
 async def cache_delete(key: str):
-    redis_client.delete(key)
+    local_cache.delete(key)
+    if redis_client is None:
+        return
+    try:
+        await _timed(redis_client.delete(key))
+    except RedisError as e:
+        _stats["errors"] += 1
+        logger.warning("Cache delete failed for %s: %s", key, e)
+
+async def get_many(keys: Iterable[str]) -> Dict[str, Any]:
+    """Fetch several keys in one round trip; missing keys are left out"""
+    found = {}
+    remote_keys = []
+    for key in keys:
+        value = local_cache.get(key)
+        if value is not None:
+            _stats["l1_hits"] += 1
+            found[key] = value
+        else:
+            remote_keys.append(key)
+    if redis_client is None:
+        _stats["misses"] += len(remote_keys)
+        return found
+    if not remote_keys:
+        return found
+
+    try:
+        values = await _timed(redis_client.mget(remote_keys))
+    except RedisError as e:
+        _stats["errors"] += 1
+        logger.warning("Cache get_many failed: %s", e)
+        return found
+    for key, data in zip(remote_keys, values):
+        if data is None:
+            _stats["misses"] += 1
+            continue
+        _stats["hits"] += 1
+        found[key] = _loads(data)
+        local_cache.set(key, found[key])
+    return found
+
+async def set_many(mapping: Dict[str, Any], expire: int = 3600):
+    """Store several keys, each with its own jittered TTL, in one pipeline"""
+    for key, value in mapping.items():
+        local_cache.set(key, value, expire)
+    if not mapping or redis_client is None:
+        return
+    pipe = redis_client.pipeline(transaction=False)
+    for key, value in mapping.items():
+        pipe.set(key, _dumps(value), ex=jittered(expire))
+    try:
+        await _timed(pipe.execute())
+    except RedisError as e:
+        _stats["errors"] += 1
+        logger.warning("Cache set_many failed: %s", e)
+
+_inflight: Dict[str, asyncio.Future] = {}
+
+async def get_or_set(key: str, loader: Callable[[], Awaitable[Any]], expire: int = 3600):
+    """Return the cached value for key, computing it once per miss with loader"""
+    value = await cache_get(key)
+    if value is not None:
+        return value
+
+    pending: Optional[asyncio.Future] = _inflight.get(key)
+    if pending is not None:
+        _stats["single_flight_waits"] += 1
+        try:
+            return await asyncio.shield(pending)
+        except asyncio.CancelledError:
+            if not pending.cancelled():
+                raise
+            # The caller running the loader was cancelled, not this one
+            return await get_or_set(key, loader, expire)
+
+    pending = asyncio.get_running_loop().create_future()
+    # Mark a failure as retrieved even when no other caller was waiting on it
+    pending.add_done_callback(lambda future: future.cancelled() or future.exception())
+    _inflight[key] = pending
+    try:
+        value = await loader()
+        await cache_set(key, value, expire)
+        pending.set_result(value)
+        return value
+    except asyncio.CancelledError:
+        pending.cancel()
+        raise
+    except Exception as e:
+        pending.set_exception(e)
+        raise
+    finally:
+        del _inflight[key]
@@ -8,6 +8,27 @@ class Settings(BaseSettings):
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+
+    # Startup Settings
+    AUTO_CREATE_SCHEMA: bool = True  # set False in production and run `alembic upgrade head`
+    LAZY_SCHEDULER_START: bool = False  # hydrate scheduled jobs after the server starts accepting
+    READINESS_CACHE_SECONDS: float = 5.0
+
+    # Worker Settings
+    RUN_SCHEDULER: bool = True  # False in API replicas when `python -m app.worker` runs separately
+    JOB_QUEUE_KEY: str = "jobs:default"
+    WORKER_CONCURRENCY: int = 4
+    JOB_QUEUE_CONSUMER_TTL: int = 30  # a silent worker's unfinished jobs are requeued after this
+    WORKER_SCHEDULER_POLL_SECONDS: float = 30.0
+    SCHEDULER_LEADER_TTL: int = 30
+    # How late a job may still run; keep it above WORKER_SCHEDULER_POLL_SECONDS
+    # so a job a worker only sees on its next poll is still fired
+    SCHEDULER_MISFIRE_GRACE_SECONDS: int = 60
+
+    # Catch-up Settings (missed scheduled firings after downtime)
+    CATCHUP_MAX_BACKFILL: int = 100000  # total backfilled events per catch-up run
+    CATCHUP_MAX_PER_TRIGGER: int = 1000
+    CATCHUP_COMMIT_EVERY: int = 1000  # triggers per bulk insert and commit
     
     # Database Settings
     POSTGRES_USER: str = "postgres"
@@ -15,18 +36,64 @@ class Settings(BaseSettings):
     POSTGRES_DB: str = "triggers"
     DB_PORT: int = 5432
     DATABASE_URL: str
+    EVENT_WRITE_BATCH_SIZE: int = 500  # max events per transaction of the SQLite single-writer queue
     
     # Redis Settings
     REDIS_HOST: str = "redis"
     REDIS_PORT: int = 6379
     REDIS_DB: int = 0
-    REDIS_URL: str = "redis://localhost:6379/0"
+    REDIS_URL: str = "redis://localhost:6379/0"  # "memory://" runs Redis-backed features in process
+    REDIS_MAX_CONNECTIONS: int = 50
+    REDIS_POOL_TIMEOUT: float = 5.0  # seconds to wait for a free pooled connection
     
     # Event Settings
     EVENT_CACHE_TTL: int = 300
+    CACHE_SERIALIZER: str = "json"  # "json", "orjson" or "msgpack"
+    CACHE_L1_MAXSIZE: int = 10000  # 0 disables the in-process tier
+    CACHE_L1_TTL: float = 5.0
+    CACHE_TTL_JITTER: float = 0.1
     EVENT_ARCHIVE_HOURS: int = 2
     EVENT_DELETE_HOURS: int = 48
 
+    # Firing Statistics Settings
+    FIRING_STATS_CHECKPOINT_SECONDS: float = 30.0
+    FIRING_STATS_RETENTION_HOURS: int = 48  # checkpoints of nodes silent this long are dropped
+    FIRING_STATS_NODE_ID: str = ""  # defaults to hostname:pid
+
+    # Profiling Settings (nothing is installed unless PROFILING_ENABLED)
+    PROFILING_ENABLED: bool = False
+    PROFILING_HEADER: str = "X-Profile"  # "1" for SQL accounting, "cpu" to also sample the CPU
+    PROFILING_SAMPLE_RATE: float = 0.0  # fraction of requests profiled without the header
+    PROFILING_SAMPLE_CPU: bool = False
+    PROFILING_SLOW_QUERIES: int = 5
+    PROFILING_N_PLUS_ONE_THRESHOLD: int = 5
+    PROFILING_CPU_INTERVAL_MS: float = 5.0
+    PROFILING_OUTPUT_DIR: str = "profiles"
+    PROFILING_MAX_FILES: int = 100  # older CPU profiles are deleted
+    PROFILING_TOKEN: str = ""  # lets X-Profile-Token stand in for a logged-in user
+
+    # Outbox Settings
+    OUTBOX_ENABLED: bool = False  # only with a running outbox relay, which drains the table
+    OUTBOX_STREAM_MODE: str = "global"  # "global" or "per_trigger"
+    OUTBOX_STREAM_PREFIX: str = "events"
+    OUTBOX_STREAM_MAXLEN: int = 100000
+    OUTBOX_BATCH_SIZE: int = 500
+    OUTBOX_POLL_INTERVAL: float = 1.0
+    OUTBOX_RETENTION_HOURS: int = 48  # undelivered messages older than this are dropped
+
+    @property
+    def IS_SQLITE(self) -> bool:
+        return self.DATABASE_URL.startswith("sqlite")
+
+    @property
+    def REDIS_ENABLED(self) -> bool:
+        return not self.REDIS_URL.startswith("memory://")
+
+    @property
+    def OUTBOX_ACTIVE(self) -> bool:
+        # Without Redis there is no stream for the relay to publish to
+        return self.OUTBOX_ENABLED and self.REDIS_ENABLED
+
     model_config = {
         "env_file": ".env",
         "extra": "allow"  # This allows extra fields from env vars
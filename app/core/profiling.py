@@ -0,0 +1,219 @@
+"""Opt-in per-request profiling: SQL accounting and CPU sampling.
+
+Nothing here is installed unless ``PROFILING_ENABLED`` is set, so a normal
+deployment pays nothing for it. When it is installed, a request is profiled
+if it is picked by ``PROFILING_SAMPLE_RATE`` or carries the
+``PROFILING_HEADER`` header (``X-Profile: 1``, or ``X-Profile: cpu`` to also
+sample the CPU). The header is only honored from an authenticated user (a
+valid bearer token) or alongside ``X-Profile-Token: <PROFILING_TOKEN>``;
+otherwise anyone could make the server sample its own stacks and fill the
+disk. Unprofiled requests cost one context variable lookup per SQL
+statement.
+
+For a profiled request the SQLAlchemy cursor hooks record every statement's
+duration. The response gets ``Server-Timing`` and ``X-DB-Query-Count``
+headers, and a summary is logged: query count, total DB time, the slowest
+statements, and any SELECT repeated ``PROFILING_N_PLUS_ONE_THRESHOLD`` or
+more times, which usually means an N+1 loop.
+
+CPU profiles are collected by a sampling thread that records the stack of
+the thread serving the request every ``PROFILING_CPU_INTERVAL_MS``. They are
+written to ``PROFILING_OUTPUT_DIR`` in folded-stack format, which flamegraph
+tools accept, from a worker thread; only the newest ``PROFILING_MAX_FILES``
+are kept. Async endpoints share the event loop thread, so their samples
+also include whatever else the loop ran meanwhile.
+"""
+import asyncio
+import hmac
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Optional
+from jose import JWTError, jwt
+from sqlalchemy import event
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+class RequestProfile:
+    def __init__(self):
+        self.query_count = 0
+        self.db_seconds = 0.0
+        self.statements = []  # (seconds, sql)
+        self.repeats = Counter()
+
+    def record(self, statement: str, seconds: float):
+        self.query_count += 1
+        self.db_seconds += seconds
+        self.statements.append((seconds, statement))
+        if statement.lstrip()[:6].upper() == "SELECT":
+            self.repeats[statement] += 1
+
+    def slowest(self, limit: int) -> list:
+        return sorted(self.statements, key=lambda item: item[0], reverse=True)[:limit]
+
+    def repeated_selects(self, threshold: int) -> list:
+        return [(count, sql) for sql, count in self.repeats.most_common() if count >= threshold]
+
+_current_profile: ContextVar[Optional[RequestProfile]] = ContextVar("request_profile", default=None)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_profile.get() is not None:
+        context._profile_started = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current_profile.get()
+    started = getattr(context, "_profile_started", None)
+    if profile is not None and started is not None:
+        profile.record(statement, time.perf_counter() - started)
+
+def install_query_hooks(engine):
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+class CpuSampler:
+    """Collects folded stacks of one thread from a background thread"""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="cpu-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def write(self, directory: str, name: str) -> str:
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{name}.folded")
+        with open(path, "w") as output:
+            for stack, count in self.stacks.most_common():
+                output.write(f"{stack} {count}\n")
+        return path
+
+def _rotate(directory: str, keep: int):
+    """Delete all but the newest keep folded-stack files in directory"""
+    # Names start with the UTC time they were written at
+    names = sorted(name for name in os.listdir(directory) if name.endswith(".folded"))
+    for name in names[:max(len(names) - keep, 0)]:
+        try:
+            os.remove(os.path.join(directory, name))
+        except FileNotFoundError:
+            pass  # rotated by another request or process
+
+def _write_cpu_profile(sampler: CpuSampler, name: str) -> str:
+    path = sampler.write(settings.PROFILING_OUTPUT_DIR, name)
+    _rotate(settings.PROFILING_OUTPUT_DIR, settings.PROFILING_MAX_FILES)
+    return path
+
+def _authorized(headers: dict) -> bool:
+    """Whether the request may ask to be profiled"""
+    token = headers.get(b"x-profile-token")
+    if settings.PROFILING_TOKEN and token is not None:
+        if hmac.compare_digest(token, settings.PROFILING_TOKEN.encode()):
+            return True
+    scheme, _, credentials = headers.get(b"authorization", b"").decode("latin-1").partition(" ")
+    if scheme.lower() != "bearer" or not credentials:
+        return False
+    try:
+        payload = jwt.decode(credentials, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        return False
+    return payload.get("sub") is not None
+
+def _profile_mode(scope) -> Optional[str]:
+    """None, "sql" or "cpu" for this request"""
+    header = settings.PROFILING_HEADER.lower().encode()
+    headers = dict(scope.get("headers", []))
+    value = headers.get(header)
+    if value is not None and _authorized(headers):
+        return "cpu" if value.strip().lower() == b"cpu" else "sql"
+    if settings.PROFILING_SAMPLE_RATE and random.random() < settings.PROFILING_SAMPLE_RATE:
+        return "cpu" if settings.PROFILING_SAMPLE_CPU else "sql"
+    return None
+
+class ProfilingMiddleware:
+    """ASGI middleware that profiles opted-in requests"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        mode = _profile_mode(scope) if scope["type"] == "http" else None
+        if mode is None:
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile()
+        token = _current_profile.set(profile)
+        sampler = None
+        if mode == "cpu":
+            sampler = CpuSampler(threading.get_ident(), settings.PROFILING_CPU_INTERVAL_MS / 1000)
+            sampler.start()
+        started = time.perf_counter()
+
+        async def send_with_timings(message):
+            if message["type"] == "http.response.start":
+                total_ms = (time.perf_counter() - started) * 1000
+                db_ms = profile.db_seconds * 1000
+                headers = list(message.get("headers", []))
+                headers.append((
+                    b"server-timing",
+                    f'db;dur={db_ms:.1f};desc="{profile.query_count} queries", app;dur={total_ms:.1f}'.encode()
+                ))
+                headers.append((b"x-db-query-count", str(profile.query_count).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timings)
+        finally:
+            _current_profile.reset(token)
+            if sampler is not None:
+                sampler.stop()
+            await self._report(scope, profile, sampler, time.perf_counter() - started)
+
+    async def _report(self, scope, profile: RequestProfile, sampler: Optional[CpuSampler], elapsed: float):
+        request = f"{scope['method']} {scope['path']}"
+        logger.info(
+            "Profile %s: %.1fms total, %d queries, %.1fms in DB",
+            request, elapsed * 1000, profile.query_count, profile.db_seconds * 1000
+        )
+        for seconds, sql in profile.slowest(settings.PROFILING_SLOW_QUERIES):
+            logger.info("  %.1fms %s", seconds * 1000, _one_line(sql))
+        for count, sql in profile.repeated_selects(settings.PROFILING_N_PLUS_ONE_THRESHOLD):
+            logger.warning("  Possible N+1 in %s: %dx %s", request, count, _one_line(sql))
+        if sampler is not None:
+            name = f"{datetime.utcnow():%Y%m%dT%H%M%S%f}-{scope['method']}-{_slug(scope['path'])}"
+            path = await asyncio.to_thread(_write_cpu_profile, sampler, name)
+            logger.info("  CPU profile written to %s", path)
+
+def _one_line(sql: str, limit: int = 200) -> str:
+    sql = " ".join(sql.split())
+    return sql if len(sql) <= limit else sql[:limit] + "..."
+
+def _slug(path: str) -> str:
+    return re.sub(r"[^A-Za-z0-9]+", "_", path).strip("_") or "root"
@@ -0,0 +1,41 @@
+"""Schema setup at startup.
+
+Alembic owns the schema. ``AUTO_CREATE_SCHEMA`` only covers the empty
+database of a first local run: its tables come from the models and it is
+stamped at the latest revision, so ``alembic upgrade head`` carries on from
+there. A database that already has tables is left to the migrations, since
+``create_all`` adds missing tables but never missing columns.
+
+``check_schema`` then refuses to start against a database that isn't at the
+latest revision, rather than failing later on a missing column.
+"""
+import logging
+import os
+from alembic.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import inspect
+from .database import Base, engine
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "alembic")
+
+def create_schema():
+    """Create and stamp the tables of an empty database; leave others alone"""
+    if inspect(engine).has_table("triggers"):
+        return
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        MigrationContext.configure(connection).stamp(ScriptDirectory(MIGRATIONS_DIR), "head")
+    logger.info("Created the database schema at the latest migration")
+
+def check_schema():
+    """Raise unless the database is at the latest migration"""
+    with engine.connect() as connection:
+        current = set(MigrationContext.configure(connection).get_current_heads())
+    expected = set(ScriptDirectory(MIGRATIONS_DIR).get_heads())
+    if current != expected:
+        raise RuntimeError(
+            f"Database schema is at {', '.join(sorted(current)) or 'no revision'}, "
+            f"expected {', '.join(sorted(expected))}; run `alembic upgrade head`"
+        )
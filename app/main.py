@@ -1,18 +1,25 @@
+import asyncio
+import logging
 from fastapi import FastAPI, Depends, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from .api.endpoints import triggers, events, auth
-from .core.database import Base, engine
-from .services.scheduler import scheduler
-from .services.event_manager import archive_old_events, delete_old_events
-from apscheduler.jobstores.base import ConflictingIdError
+from .core.database import engine
+from .core.schema import check_schema, create_schema
+from .services.firing_stats import run_checkpoints
+from .services.scheduler import scheduler, init_scheduler, hydrate_scheduler
 from app.core.config import settings
+from app.core.profiling import ProfilingMiddleware, install_query_hooks
 from sqlalchemy import create_engine
 from app.api.routers.health import router as health_router
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+# Create the tables of an empty database; otherwise the schema is Alembic's
+if settings.AUTO_CREATE_SCHEMA:
+    create_schema()
+check_schema()
+
+logger = logging.getLogger(__name__)
 
 app = FastAPI(title="Event Trigger Platform")
 
@@ -25,6 +32,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Opt-in request profiling; left out entirely unless enabled
+if settings.PROFILING_ENABLED:
+    install_query_hooks(engine)
+    app.add_middleware(ProfilingMiddleware)
+
 # Include routers
 app.include_router(health_router)
 app.include_router(triggers.router, prefix="/api/v1/triggers", tags=["triggers"])
@@ -41,46 +53,30 @@ async def root():
 async def status():
     return {"status": "healthy", "environment": settings.ENVIRONMENT}
 
+def _log_hydration_failure(task: asyncio.Task):
+    # Nothing awaits the background hydration, so its errors would go unseen
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Scheduler hydration failed", exc_info=task.exception())
+
 @app.on_event("startup")
 async def startup_event():
-    if not scheduler.running:
-        scheduler.start()
-    
-    # Add cleanup jobs with conflict handling
-    cleanup_jobs = [
-        {
-            'id': 'archive_old_events',
-            'func': archive_old_events,
-            'trigger': 'interval',
-            'minutes': 30
-        },
-        {
-            'id': 'delete_old_events',
-            'func': delete_old_events,
-            'trigger': 'interval',
-            'hours': 24
-        }
-    ]
-
-    for job in cleanup_jobs:
-        try:
-            # Remove existing job if it exists
-            scheduler.remove_job(job['id'])
-        except:
-            pass  # Job doesn't exist yet
-        
-        try:
-            # Add the job
-            scheduler.add_job(
-                job['func'],
-                job['trigger'],
-                id=job['id'],
-                **{k: v for k, v in job.items() if k not in ['id', 'func', 'trigger']}
-            )
-        except ConflictingIdError:
-            # Job already exists, skip
-            pass
+    app.state.stop_checkpoints = asyncio.Event()
+    app.state.firing_stats_checkpoints = asyncio.create_task(
+        run_checkpoints(app.state.stop_checkpoints)
+    )
+    if settings.LAZY_SCHEDULER_START:
+        # Keep a reference so the task isn't garbage collected mid-flight
+        app.state.scheduler_hydration = asyncio.create_task(
+            hydrate_scheduler(paused=not settings.RUN_SCHEDULER)
+        )
+        app.state.scheduler_hydration.add_done_callback(_log_hydration_failure)
+    else:
+        await init_scheduler(paused=not settings.RUN_SCHEDULER)
 
 @app.on_event("shutdown")
 async def shutdown_event():
-    scheduler.shutdown()
\ No newline at end of file
+    # Flush this process's firing statistics before exiting
+    app.state.stop_checkpoints.set()
+    await app.state.firing_stats_checkpoints
+    if scheduler.running:
+        scheduler.shutdown()
\ No newline at end of file
@@ -1,14 +1,45 @@
-from sqlalchemy import Column, String, DateTime, JSON, UUID, Boolean, ForeignKey
-from sqlalchemy.sql import func
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import Column, String, DateTime, JSON, Boolean, ForeignKey, Index, case, func
 import uuid
-from ..core.database import Base
+from ..core.config import settings
+from ..core.database import Base, GUID
 
 class Event(Base):
     __tablename__ = "events"
-    
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    trigger_id = Column(UUID(as_uuid=True), ForeignKey("triggers.id"))
+
+    id = Column(GUID(), primary_key=True, default=uuid.uuid4)
+    trigger_id = Column(GUID(), ForeignKey("triggers.id"))
     payload = Column(JSON, nullable=True)
-    triggered_at = Column(DateTime(timezone=True), server_default=func.now())
-    status = Column(String, default="active")  # active, archived, deleted
-    is_test = Column(Boolean, default=False)
\ No newline at end of file
+    triggered_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    # Explicit override only; otherwise status follows from triggered_at (see event_status)
+    status = Column(String, nullable=True)
+    is_test = Column(Boolean, default=False)
+
+    __table_args__ = (
+        # Only overrides are indexed, which keeps the index tiny
+        Index(
+            "ix_events_status_override", "status",
+            postgresql_where=status.isnot(None), sqlite_where=status.isnot(None)
+        ),
+    )
+
+def archive_cutoff(now: datetime = None) -> datetime:
+    """Events triggered at or before this time are archived"""
+    return (now or datetime.now(timezone.utc)) - timedelta(hours=settings.EVENT_ARCHIVE_HOURS)
+
+def event_status(triggered_at: datetime, status: str = None, cutoff: datetime = None) -> str:
+    """Status of an event: its override if set, else active or archived by age"""
+    if status is not None:
+        return status
+    cutoff = cutoff or archive_cutoff()
+    if triggered_at.tzinfo is None:
+        # SQLite hands back naive datetimes, stored in UTC
+        triggered_at = triggered_at.replace(tzinfo=timezone.utc)
+    return "archived" if triggered_at <= cutoff else "active"
+
+def status_expression(cutoff: datetime):
+    """SQL equivalent of event_status"""
+    return func.coalesce(
+        Event.status,
+        case((Event.triggered_at <= cutoff, "archived"), else_="active")
+    )
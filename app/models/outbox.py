@@ -0,0 +1,19 @@
+from sqlalchemy import Column, String, DateTime, JSON, BigInteger, Integer
+from sqlalchemy.sql import func
+from ..core.database import Base, GUID
+
+class OutboxMessage(Base):
+    """Pending stream message, written in the same transaction as its event.
+
+    Rows are deleted by the relay once they have been published, so the table
+    only ever holds the undelivered backlog.
+    """
+    __tablename__ = "event_outbox"
+
+    # SQLite only autoincrements INTEGER PRIMARY KEY columns
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    event_id = Column(GUID(), nullable=False)
+    trigger_id = Column(GUID(), nullable=False)
+    stream = Column(String, nullable=False)  # Redis Stream key the relay publishes to
+    payload = Column(JSON, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -1,12 +1,12 @@
-from sqlalchemy import Column, String, DateTime, JSON, UUID, Boolean, CheckConstraint
+from sqlalchemy import Column, String, DateTime, JSON, Boolean, CheckConstraint
 from sqlalchemy.sql import func
 import uuid
-from ..core.database import Base
+from ..core.database import Base, GUID
 
 class Trigger(Base):
     __tablename__ = "triggers"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(GUID(), primary_key=True, default=uuid.uuid4)
     type = Column(String, nullable=False)  # "scheduled" or "api"
     schedule = Column(String, nullable=True)
     api_schema = Column(JSON, nullable=True)
@@ -16,6 +16,8 @@ class Trigger(Base):
     recurring_pattern = Column(String, nullable=True)  # cron expression for recurring schedules
     api_endpoint = Column(String, nullable=True)  # endpoint path for API triggers
     api_method = Column(String, nullable=True)  # HTTP method for API triggers
+    next_fire_at = Column(DateTime(timezone=True), nullable=True, index=True)  # next due time for scheduled triggers
+    catchup_policy = Column(String, nullable=False, default="skip", server_default="skip")  # "skip", "coalesce" or "backfill"
 
     # Add constraint to validate trigger type
     __table_args__ = (
@@ -23,5 +25,9 @@ class Trigger(Base):
             type.in_(['scheduled', 'api']),
             name='check_trigger_type'
         ),
+        CheckConstraint(
+            catchup_policy.in_(['skip', 'coalesce', 'backfill']),
+            name='check_trigger_catchup_policy'
+        ),
     )
 
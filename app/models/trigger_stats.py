@@ -0,0 +1,18 @@
+from sqlalchemy import Column, String, DateTime, JSON, Index
+from sqlalchemy.sql import func
+from ..core.database import Base, GUID
+
+class TriggerStatsCheckpoint(Base):
+    """Latest firing statistics of one trigger as seen by one process.
+
+    Every process that creates events keeps its statistics in memory and
+    upserts them here periodically; readers merge the rows of all nodes.
+    """
+    __tablename__ = "trigger_stats"
+
+    trigger_id = Column(GUID(), primary_key=True)
+    node_id = Column(String, primary_key=True)
+    stats = Column(JSON, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (Index("ix_trigger_stats_updated_at", "updated_at"),)
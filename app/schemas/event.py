@@ -1,7 +1,8 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, model_validator
 from typing import Optional, Dict, Any
 from datetime import datetime
 import uuid
+from ..models.event import event_status
 
 class EventBase(BaseModel):
     trigger_id: uuid.UUID
@@ -16,6 +17,20 @@ class Event(EventBase):
     triggered_at: datetime
     status: str
 
+    @model_validator(mode="before")
+    @classmethod
+    def derive_status(cls, data):
+        """Fill in status from the event's age unless it has an explicit override"""
+        if isinstance(data, dict):
+            if data.get("status") is None and data.get("triggered_at") is not None:
+                data = {**data, "status": event_status(data["triggered_at"])}
+            return data
+        if getattr(data, "status", None) is None and getattr(data, "triggered_at", None) is not None:
+            # Read the ORM object into a dict rather than setting status on it
+            data = {name: getattr(data, name) for name in cls.model_fields}
+            data["status"] = event_status(data["triggered_at"])
+        return data
+
     class Config:
         from_attributes = True
 
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Literal
 from datetime import datetime
 import uuid
 
@@ -9,6 +9,7 @@ class TriggerBase(BaseModel):
     api_schema: Optional[Dict[str, Any]] = None
     recurring: Optional[bool] = False  # Add this field
     recurring_pattern: Optional[str] = None  # Add this field
+    catchup_policy: Literal["skip", "coalesce", "backfill"] = "skip"  # what to do with missed firings
 
 class TriggerCreate(TriggerBase):
     pass
@@ -17,6 +18,37 @@ class Trigger(TriggerBase):
     id: uuid.UUID
     created_at: datetime
     is_active: bool
+    next_fire_at: Optional[datetime] = None
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class LatencySummary(BaseModel):
+    count: int
+    mean: float
+    min: float
+    max: float
+    p50: float
+    p90: float
+    p99: float
+
+class FiringStats(BaseModel):
+    trigger_id: uuid.UUID
+    nodes: int
+    events: int
+    last_fired_at: Optional[datetime] = None
+    rates: Dict[str, float]  # events per second over the last 1m, 5m, 15m and 1h
+    inter_arrival_seconds: Optional[LatencySummary] = None
+    schedule_delay_seconds: Optional[LatencySummary] = None
+
+class FireCountBucket(BaseModel):
+    minute: datetime
+    count: int
+
+class UpcomingFirings(BaseModel):
+    window_minutes: int
+    start: datetime
+    end: datetime
+    total: int
+    histogram: List[FireCountBucket]
+    peaks: List[FireCountBucket]
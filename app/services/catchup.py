@@ -0,0 +1,184 @@
+"""Bulk catch-up of scheduled firings missed while no scheduler was running.
+
+APScheduler drops runs that are more than ``misfire_grace_time`` late, so
+after an outage the only record of what was missed is ``next_fire_at``: any
+scheduled trigger whose next firing lies further in the past than that did
+not fire and never will. Once the scheduler is firing again, each such
+trigger is handled according to its ``catchup_policy``:
+
+- ``skip``: nothing is materialized, the index just moves forward
+- ``coalesce``: one event, stamped with the most recent missed time
+- ``backfill``: one event per missed time, keeping the newest ones when
+  capped at ``CATCHUP_MAX_PER_TRIGGER`` per trigger or
+  ``CATCHUP_MAX_BACKFILL`` overall; once the overall cap is spent, backfill
+  triggers coalesce
+
+Events are written with their original scheduled timestamps through one
+multi-row insert per chunk of ``CATCHUP_COMMIT_EVERY`` triggers, instead of
+one session and commit per missed run.
+
+The cutoff is the start of the grace window, so catch-up and APScheduler
+split the missed runs between them without overlap: older runs are
+materialized here, newer ones are still fired by the scheduler.
+"""
+import logging
+import uuid
+from datetime import datetime, timedelta
+from functools import lru_cache
+from croniter import croniter
+from sqlalchemy import bindparam, insert, update
+from sqlalchemy.orm import Session
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..models.event import Event
+from ..models.outbox import OutboxMessage
+from ..models.trigger import Trigger
+from .event_manager import outbox_stream
+from .schedule_index import next_fire_time, utcnow
+
+logger = logging.getLogger(__name__)
+
+# Runs can drop out of the grace window while a pass is running, so passes
+# repeat until one finds nothing; this only bounds a misbehaving schedule
+MAX_CATCHUP_PASSES = 5
+
+@lru_cache(maxsize=4096)
+def missed_fire_times(pattern: str, since: datetime, now: datetime, limit: int) -> tuple:
+    """Up to `limit` of the most recent cron times in [since, now), oldest first
+
+    Triggers sharing a pattern miss the same runs, so results are cached.
+    """
+    times = []
+    iterator = croniter(pattern, now)
+    while len(times) < limit:
+        fire_at = iterator.get_prev(datetime)
+        if fire_at < since:
+            break
+        times.append(fire_at)
+    return tuple(reversed(times))
+
+def _event_rows(trigger_id, fire_times) -> tuple:
+    events, messages = [], []
+    for fire_at in fire_times:
+        event_id = uuid.uuid4()
+        events.append({
+            "id": event_id,
+            "trigger_id": trigger_id,
+            "triggered_at": fire_at,
+            "payload": None,
+            "is_test": False,
+        })
+        if settings.OUTBOX_ACTIVE:
+            messages.append({
+                "event_id": event_id,
+                "trigger_id": trigger_id,
+                "stream": outbox_stream(trigger_id),
+                "payload": {"payload": None, "is_test": False, "triggered_at": fire_at.isoformat()},
+            })
+    return events, messages
+
+# Core statements skip the ORM's per-row bookkeeping for these executemany calls
+_insert_events = insert(Event.__table__)
+_insert_messages = insert(OutboxMessage.__table__)
+# Only moves the index if the trigger hasn't fired since it was read, so a
+# concurrent firing is never rewound
+_advance_index = update(Trigger.__table__).where(
+    Trigger.__table__.c.id == bindparam("trigger_id"),
+    Trigger.__table__.c.next_fire_at == bindparam("read_next_fire_at")
+).values(next_fire_at=bindparam("next_fire_at"))
+
+def _flush(db: Session, events: list, messages: list, index_updates: list):
+    if events:
+        db.execute(_insert_events, events)
+    if messages:
+        db.execute(_insert_messages, messages)
+    if index_updates:
+        db.execute(_advance_index, index_updates)
+    db.commit()
+
+def catch_up_missed_firings(db: Session, now: datetime = None) -> dict:
+    """Materialize firings missed before `now` and advance the next-fire index"""
+    now = now or utcnow()
+    overdue = db.query(
+        Trigger.id,
+        Trigger.type,
+        Trigger.schedule,
+        Trigger.recurring,
+        Trigger.recurring_pattern,
+        Trigger.catchup_policy,
+        Trigger.next_fire_at
+    ).filter(
+        Trigger.type == "scheduled",
+        Trigger.is_active.is_(True),
+        Trigger.next_fire_at.isnot(None),
+        Trigger.next_fire_at <= now
+    ).order_by(Trigger.next_fire_at).all()
+
+    budget = settings.CATCHUP_MAX_BACKFILL
+    summary = {"triggers": len(overdue), "events": 0, "skipped": 0}
+    events, messages, index_updates = [], [], []
+
+    for position, trigger in enumerate(overdue, start=1):
+        since = trigger.next_fire_at
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=now.tzinfo)
+
+        if trigger.catchup_policy == "skip":
+            fire_times = ()
+        elif not trigger.recurring:
+            fire_times = (since,)
+        else:
+            limit = 1
+            if trigger.catchup_policy == "backfill":
+                limit = max(1, min(settings.CATCHUP_MAX_PER_TRIGGER, budget))
+            fire_times = missed_fire_times(trigger.recurring_pattern, since, now, limit)
+
+        if fire_times:
+            budget = max(0, budget - len(fire_times))
+            trigger_events, trigger_messages = _event_rows(trigger.id, fire_times)
+            events.extend(trigger_events)
+            messages.extend(trigger_messages)
+            summary["events"] += len(fire_times)
+        else:
+            summary["skipped"] += 1
+        index_updates.append({
+            "trigger_id": trigger.id,
+            "read_next_fire_at": trigger.next_fire_at,
+            # First run at or after the cutoff: it's the scheduler's to fire
+            "next_fire_at": next_fire_time(trigger, now - timedelta(microseconds=1))
+        })
+
+        if position % settings.CATCHUP_COMMIT_EVERY == 0:
+            _flush(db, events, messages, index_updates)
+            events, messages, index_updates = [], [], []
+
+    _flush(db, events, messages, index_updates)
+    if overdue:
+        logger.info(
+            "Caught up %d overdue triggers: %d events materialized, %d skipped",
+            summary["triggers"], summary["events"], summary["skipped"]
+        )
+    return summary
+
+def run_catch_up():
+    """Catch up on everything the running scheduler is too late to fire
+
+    Call it once the scheduler is firing. Uses a session of its own and logs
+    rather than blocking startup on failure.
+    """
+    grace = timedelta(seconds=settings.SCHEDULER_MISFIRE_GRACE_SECONDS)
+    db = SessionLocal()
+    try:
+        total = {"triggers": 0, "events": 0, "skipped": 0}
+        for _ in range(MAX_CATCHUP_PASSES):
+            summary = catch_up_missed_firings(db, now=utcnow() - grace)
+            for key in total:
+                total[key] += summary[key]
+            if not summary["triggers"]:
+                break
+        return total
+    except Exception:
+        db.rollback()
+        logger.exception("Catch-up of missed firings failed")
+    finally:
+        db.close()
@@ -1,9 +1,75 @@
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from ..models.event import Event
+from sqlalchemy import func, or_, and_, select
+import uuid
+from ..models.event import Event, archive_cutoff, status_expression
+from ..models.outbox import OutboxMessage
+from ..models.trigger import Trigger
 from ..schemas.event import EventCreate
+from ..core.config import settings
 from ..core.database import SessionLocal, get_db
+from .firing_stats import record_firing
+from .schedule_index import next_fire_time, utcnow
+from .write_queue import event_writer
+
+def outbox_stream(trigger_id) -> str:
+    """Redis Stream key that events for trigger_id are published to"""
+    if settings.OUTBOX_STREAM_MODE == "per_trigger":
+        return f"{settings.OUTBOX_STREAM_PREFIX}:{trigger_id}"
+    return settings.OUTBOX_STREAM_PREFIX
+
+def add_event(db: Session, db_event: Event):
+    """Stage an event and its outbox message in the session's open transaction"""
+    # Assign the id and time up front so the outbox row can carry them
+    # without a flush and the stream entry matches the event exactly
+    if db_event.id is None:
+        db_event.id = uuid.uuid4()
+    if db_event.triggered_at is None:
+        db_event.triggered_at = utcnow()
+    db.add(db_event)
+    if settings.OUTBOX_ACTIVE:
+        db.add(OutboxMessage(
+            event_id=db_event.id,
+            trigger_id=db_event.trigger_id,
+            stream=outbox_stream(db_event.trigger_id),
+            payload={
+                "payload": db_event.payload,
+                "is_test": bool(db_event.is_test),
+                "triggered_at": db_event.triggered_at.isoformat()
+            }
+        ))
+
+def advance_trigger(db: Session, trigger_id):
+    """Move a trigger's next-fire index past a firing happening now.
+
+    Returns the time the firing was due, the index's previous value.
+    """
+    trigger = db.get(Trigger, trigger_id)
+    if trigger is None:
+        return None
+    scheduled_at = trigger.next_fire_at
+    trigger.next_fire_at = next_fire_time(trigger)
+    return scheduled_at
+
+def _record(db_event: Event, scheduled_at=None):
+    if not db_event.is_test:
+        record_firing(db_event.trigger_id, db_event.triggered_at, scheduled_at)
+
+async def _write_queued(db_event: Event, advance: bool = False) -> Event:
+    """Commit an event through the SQLite single-writer queue"""
+    # The writer hands back a detached object, so nothing can be refreshed
+    # from the database afterwards: stamp the time client-side instead
+    db_event.triggered_at = utcnow()
+
+    def stage(session: Session):
+        add_event(session, db_event)
+        if advance:
+            return db_event, advance_trigger(session, db_event.trigger_id)
+        return db_event, None
+
+    db_event, scheduled_at = await event_writer.submit(stage)
+    _record(db_event, scheduled_at)
+    return db_event
 
 async def create_event_from_trigger(trigger_id: str):
     """Create event from trigger_id - used by scheduler"""
@@ -11,13 +77,17 @@ async def create_event_from_trigger(trigger_id: str):
     try:
         event = EventCreate(
             trigger_id=trigger_id,
-            status="active",
             triggered_at=datetime.utcnow()
         )
         db_event = Event(**event.dict())
-        db.add(db_event)
+        if settings.IS_SQLITE:
+            return await _write_queued(db_event, advance=True)
+        add_event(db, db_event)
+        # Advance the trigger's next-fire index in the same commit
+        scheduled_at = advance_trigger(db, db_event.trigger_id)
         db.commit()
         db.refresh(db_event)
+        _record(db_event, scheduled_at)
         return db_event
     finally:
         db.close()
@@ -29,25 +99,16 @@ def get_db():
     finally:
         db.close()
 
-async def create_event(db: Session, event: EventCreate):
-    db_event = Event(**event.dict())
-    db.add(db_event)
+async def create_event(db: Session, event: EventCreate, event_id: uuid.UUID = None):
+    db_event = Event(id=event_id, **event.dict())
+    if settings.IS_SQLITE:
+        return await _write_queued(db_event)
+    add_event(db, db_event)
     db.commit()
     db.refresh(db_event)
+    _record(db_event)
     return db_event
 
-async def archive_old_events():
-    db = next(get_db())
-    try:
-        two_hours_ago = datetime.utcnow() - timedelta(hours=2)
-        db.query(Event).filter(
-            Event.triggered_at <= two_hours_ago,
-            Event.status == "active"
-        ).update({"status": "archived"})
-        db.commit()
-    finally:
-        db.close()
-
 async def delete_old_events():
     db = next(get_db())
     try:
@@ -55,6 +116,12 @@ async def delete_old_events():
         db.query(Event).filter(
             Event.triggered_at <= forty_eight_hours_ago
         ).delete()
+        # Messages no relay delivered in time; keeps the outbox bounded when
+        # the relay is down or was never deployed
+        outbox_cutoff = datetime.utcnow() - timedelta(hours=settings.OUTBOX_RETENTION_HOURS)
+        db.query(OutboxMessage).filter(
+            OutboxMessage.created_at <= outbox_cutoff
+        ).delete()
         db.commit()
     finally:
         db.close()
@@ -62,7 +129,13 @@ async def delete_old_events():
 async def get_events(db: Session, skip: int = 0, limit: int = 100, status: str = None):
     """Get events with optional status filter"""
     query = db.query(Event)
-    if status:
+    if status in ("active", "archived"):
+        # Status follows from age, so the filter is a range on triggered_at;
+        # events with an explicit status override are matched on it instead
+        cutoff = archive_cutoff()
+        by_age = Event.triggered_at > cutoff if status == "active" else Event.triggered_at <= cutoff
+        query = query.filter(or_(and_(Event.status.is_(None), by_age), Event.status == status))
+    elif status:
         query = query.filter(Event.status == status)
     return query.offset(skip).limit(limit).all()
 
@@ -73,18 +146,26 @@ async def get_event(db: Session, event_id: str):
 async def get_aggregated_events(db: Session, hours: int = 48):
     """Get aggregated events from the last N hours"""
     time_threshold = datetime.utcnow() - timedelta(hours=hours)
-    
-    aggregated_events = db.query(
+
+    # Derive the status in a subquery so the outer query groups by its label
+    events = select(
+        Event.id,
         Event.trigger_id,
-        func.count(Event.id).label('count'),
-        func.max(Event.triggered_at).label('last_triggered'),
-        func.min(Event.triggered_at).label('first_triggered'),
-        Event.status
-    ).filter(
+        Event.triggered_at,
+        status_expression(archive_cutoff()).label('status')
+    ).where(
         Event.triggered_at >= time_threshold
+    ).subquery()
+
+    aggregated_events = db.query(
+        events.c.trigger_id,
+        func.count(events.c.id).label('count'),
+        func.max(events.c.triggered_at).label('last_triggered'),
+        func.min(events.c.triggered_at).label('first_triggered'),
+        events.c.status
     ).group_by(
-        Event.trigger_id,
-        Event.status
+        events.c.trigger_id,
+        events.c.status
     ).all()
     
     return aggregated_events
@@ -0,0 +1,374 @@
+"""Streaming per-trigger firing statistics.
+
+Each process keeps, for every trigger it has fired since starting:
+
+- event counts in ``BUCKET_SECONDS`` buckets covering the last hour, from
+  which events per second over the ``RATE_WINDOWS`` are read
+- a sketch of the time between consecutive events
+- for scheduled triggers, a sketch of how late each firing was compared to
+  the trigger's ``next_fire_at``
+
+They are updated as events are created, never from the events table. Every
+``FIRING_STATS_CHECKPOINT_SECONDS`` the triggers that changed are upserted
+into ``trigger_stats`` under this process's node id, serialised and written
+off the event loop. A read merges the checkpoints of the other nodes with
+this node's live state, so its cost depends on the number of nodes, not on
+the number of events.
+
+Triggers that have not fired for ``HISTORY_SECONDS`` are dropped from memory
+once checkpointed; their checkpoint stands in for them until they fire again,
+when it is loaded back and merged with the new firings.
+
+Inter-arrival times are measured per process: when API firings of one
+trigger are spread over several replicas, each sees only its share.
+"""
+import asyncio
+import logging
+import math
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from sqlalchemy import bindparam, delete, select
+from sqlalchemy.orm import Session
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..models.trigger_stats import TriggerStatsCheckpoint
+from .write_queue import event_writer
+
+logger = logging.getLogger(__name__)
+
+BUCKET_SECONDS = 10
+RATE_WINDOWS = {"1m": 60, "5m": 300, "15m": 900, "1h": 3600}
+HISTORY_SECONDS = max(RATE_WINDOWS.values())
+QUANTILES = {"p50": 0.5, "p90": 0.9, "p99": 0.99}
+
+NODE_ID = settings.FIRING_STATS_NODE_ID or f"{socket.gethostname()}:{os.getpid()}"
+
+def _epoch(moment: datetime) -> float:
+    # SQLite hands back naive datetimes; everything is stored in UTC
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+class LogSketch:
+    """Mergeable quantile sketch of non-negative values (DDSketch style).
+
+    Values fall into logarithmic bins whose bounds grow by a factor
+    ``gamma``, so any quantile is returned within ``relative_accuracy`` of
+    the true value. Merging two sketches adds their bin counts.
+    """
+    MAX_BINS = 2048
+    MIN_VALUE = 1e-3  # smaller values, and negative ones, count as zero
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins = {}
+        self.zeros = 0
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value: float):
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        if value < self.MIN_VALUE:
+            self.zeros += 1
+            return
+        index = math.ceil(math.log(value) / self._log_gamma)
+        self.bins[index] = self.bins.get(index, 0) + 1
+        if len(self.bins) > self.MAX_BINS:
+            self._collapse()
+
+    def _collapse(self):
+        """Fold the lowest bins together, trading accuracy at the low end for space"""
+        indexes = sorted(self.bins)
+        excess = indexes[:len(indexes) - self.MAX_BINS + 1]
+        self.bins[excess[-1]] = sum(self.bins.pop(index) for index in excess)
+
+    def merge(self, other: "LogSketch"):
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+        if len(self.bins) > self.MAX_BINS:
+            self._collapse()
+        self.zeros += other.zeros
+        self.count += other.count
+        self.total += other.total
+        if other.count:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zeros
+        if rank < seen:
+            return max(self.min, 0.0)
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if rank < seen:
+                # Midpoint of the bin, in the sense of relative error
+                value = 2 * self.gamma ** index / (self.gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def summary(self) -> Optional[dict]:
+        if not self.count:
+            return None
+        result = {"count": self.count, "mean": self.total / self.count, "min": self.min, "max": self.max}
+        result.update({name: self.quantile(q) for name, q in QUANTILES.items()})
+        return result
+
+    def to_dict(self) -> dict:
+        return {
+            "bins": {str(index): count for index, count in self.bins.items()},
+            "zeros": self.zeros,
+            "count": self.count,
+            "total": self.total,
+            "min": self.min,
+            "max": self.max,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "LogSketch":
+        sketch = cls()
+        sketch.bins = {int(index): count for index, count in data["bins"].items()}
+        sketch.zeros = data["zeros"]
+        sketch.count = data["count"]
+        sketch.total = data["total"]
+        sketch.min = data["min"]
+        sketch.max = data["max"]
+        return sketch
+
+class TriggerStats:
+    """Firing statistics of one trigger"""
+
+    def __init__(self):
+        self.count = 0
+        self.last_at = None  # epoch seconds
+        self.buckets = {}  # bucket start (epoch seconds) -> events
+        self.inter_arrival = LogSketch()
+        self.delay = LogSketch()
+
+    def record(self, at: float, scheduled_at: Optional[float] = None):
+        if self.last_at is not None and at >= self.last_at:
+            self.inter_arrival.add(at - self.last_at)
+        if scheduled_at is not None:
+            # Early firings count as on time
+            self.delay.add(max(at - scheduled_at, 0.0))
+        self.count += 1
+        self.last_at = at if self.last_at is None else max(self.last_at, at)
+        bucket = int(at // BUCKET_SECONDS) * BUCKET_SECONDS
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self._prune(at)
+
+    def _prune(self, now: float):
+        horizon = now - HISTORY_SECONDS - BUCKET_SECONDS
+        for bucket in [bucket for bucket in self.buckets if bucket < horizon]:
+            del self.buckets[bucket]
+
+    def rates(self, now: float) -> dict:
+        """Events per second over each of RATE_WINDOWS"""
+        return {
+            name: sum(count for bucket, count in self.buckets.items() if bucket > now - seconds) / seconds
+            for name, seconds in RATE_WINDOWS.items()
+        }
+
+    def merge(self, other: "TriggerStats"):
+        self.count += other.count
+        if other.last_at is not None:
+            self.last_at = other.last_at if self.last_at is None else max(self.last_at, other.last_at)
+        for bucket, count in other.buckets.items():
+            self.buckets[bucket] = self.buckets.get(bucket, 0) + count
+        self.inter_arrival.merge(other.inter_arrival)
+        self.delay.merge(other.delay)
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "last_at": self.last_at,
+            "buckets": {str(bucket): count for bucket, count in self.buckets.items()},
+            "inter_arrival": self.inter_arrival.to_dict(),
+            "delay": self.delay.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "TriggerStats":
+        stats = cls()
+        stats.count = data["count"]
+        stats.last_at = data["last_at"]
+        stats.buckets = {int(bucket): count for bucket, count in data["buckets"].items()}
+        stats.inter_arrival = LogSketch.from_dict(data["inter_arrival"])
+        stats.delay = LogSketch.from_dict(data["delay"])
+        return stats
+
+# This process's statistics, keyed by trigger id string. They are updated on
+# the event loop and read by checkpoint and request threads, under _lock.
+_stats = {}
+_lock = threading.Lock()
+# Triggers updated since the last checkpoint; only touched on the event loop
+_dirty = set()
+# Triggers dropped from _stats while idle whose checkpoint has not been
+# merged back yet
+_evicted = set()
+
+def record_firing(trigger_id, triggered_at: Optional[datetime] = None, scheduled_at: Optional[datetime] = None):
+    """Count one event of trigger_id; scheduled_at is when it was due, if scheduled"""
+    key = str(trigger_id)
+    at = _epoch(triggered_at) if triggered_at is not None else time.time()
+    scheduled = _epoch(scheduled_at) if scheduled_at is not None else None
+    with _lock:
+        stats = _stats.get(key)
+        if stats is None:
+            stats = _stats[key] = TriggerStats()
+        stats.record(at, scheduled)
+    _dirty.add(key)
+
+def _upsert(dialect_name: str):
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return None
+    return insert
+
+def _restore_evicted(db: Session, keys: list):
+    """Merge the checkpoints of evicted triggers that fired again into _stats"""
+    with _lock:
+        evicted = [key for key in keys if key in _evicted]
+    if not evicted:
+        return
+    stored = dict(db.execute(select(TriggerStatsCheckpoint.trigger_id, TriggerStatsCheckpoint.stats).where(
+        TriggerStatsCheckpoint.trigger_id.in_(evicted),
+        TriggerStatsCheckpoint.node_id == NODE_ID
+    )).all())
+    for key in evicted:
+        data = stored.get(uuid.UUID(key))
+        with _lock:
+            if data is not None:
+                restored = TriggerStats.from_dict(data)
+                restored.merge(_stats[key])
+                _stats[key] = restored
+            _evicted.discard(key)
+
+def _write_checkpoint(db: Session, keys: list):
+    """Upsert this node's statistics of keys in one statement"""
+    now = datetime.now(timezone.utc)
+    _restore_evicted(db, keys)
+    rows = []
+    for key in keys:
+        # One trigger at a time, so the event loop never waits on more
+        with _lock:
+            stats = _stats[key].to_dict()
+        rows.append({"trigger_id": key, "node_id": NODE_ID, "stats": stats, "updated_at": now})
+
+    table = TriggerStatsCheckpoint.__table__
+    insert = _upsert(db.get_bind().dialect.name)
+    if insert is None:
+        db.execute(
+            delete(table).where(table.c.trigger_id == bindparam("trigger_id"), table.c.node_id == bindparam("node_id")),
+            [{"trigger_id": row["trigger_id"], "node_id": NODE_ID} for row in rows]
+        )
+        db.execute(table.insert(), rows)
+    else:
+        statement = insert(table)
+        db.execute(statement.on_conflict_do_update(
+            index_elements=["trigger_id", "node_id"],
+            set_={"stats": statement.excluded.stats, "updated_at": statement.excluded.updated_at}
+        ), rows)
+    # Drop checkpoints of processes that have been gone for a while
+    db.execute(delete(TriggerStatsCheckpoint).where(
+        TriggerStatsCheckpoint.updated_at < now - timedelta(hours=settings.FIRING_STATS_RETENTION_HOURS)
+    ))
+
+def _checkpoint_sync(keys: list):
+    db = SessionLocal()
+    try:
+        _write_checkpoint(db, keys)
+        db.commit()
+    finally:
+        db.close()
+
+def _evict_idle(now: float):
+    """Drop checkpointed triggers that have not fired within HISTORY_SECONDS"""
+    horizon = now - HISTORY_SECONDS
+    with _lock:
+        idle = [key for key, stats in _stats.items() if key not in _dirty and stats.last_at < horizon]
+        for key in idle:
+            del _stats[key]
+            _evicted.add(key)
+
+async def checkpoint():
+    """Persist the statistics of triggers that changed since the last checkpoint"""
+    if _dirty:
+        keys = list(_dirty)
+        _dirty.clear()
+        try:
+            if settings.IS_SQLITE:
+                await event_writer.submit(lambda db: _write_checkpoint(db, keys))
+            else:
+                await asyncio.to_thread(_checkpoint_sync, keys)
+        except Exception:
+            # Retry these triggers with the next checkpoint
+            _dirty.update(keys)
+            raise
+    _evict_idle(time.time())
+
+async def run_checkpoints(stop: asyncio.Event):
+    """Checkpoint periodically until stop is set, then once more"""
+    while not stop.is_set():
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=settings.FIRING_STATS_CHECKPOINT_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        try:
+            await checkpoint()
+        except Exception:
+            logger.exception("Firing statistics checkpoint failed")
+
+def get_firing_stats(db: Session, trigger_id) -> dict:
+    """Statistics of trigger_id merged across all nodes"""
+    key = str(trigger_id)
+    merged = TriggerStats()
+    nodes = 0
+    rows = db.execute(select(TriggerStatsCheckpoint.node_id, TriggerStatsCheckpoint.stats).where(
+        TriggerStatsCheckpoint.trigger_id == trigger_id
+    )).all()
+    with _lock:
+        live = _stats.get(key)
+        # This node's checkpoint only counts while the trigger is evicted
+        own_stored = live is None or key in _evicted
+        own = False
+        for node_id, stats in rows:
+            if node_id == NODE_ID and not own_stored:
+                continue
+            merged.merge(TriggerStats.from_dict(stats))
+            if node_id == NODE_ID:
+                own = True
+            else:
+                nodes += 1
+        if live is not None:
+            merged.merge(live)
+            own = True
+    nodes += own
+
+    now = time.time()
+    return {
+        "trigger_id": trigger_id,
+        "nodes": nodes,
+        "events": merged.count,
+        "last_fired_at": datetime.fromtimestamp(merged.last_at, timezone.utc) if merged.last_at else None,
+        "rates": merged.rates(now),
+        "inter_arrival_seconds": merged.inter_arrival.summary(),
+        "schedule_delay_seconds": merged.delay.summary(),
+    }
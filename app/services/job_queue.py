@@ -0,0 +1,180 @@
+"""Redis-backed job queue used to hand work from the API to workers.
+
+Jobs are JSON messages pushed onto the ``JOB_QUEUE_KEY`` list and taken by
+``python -m app.worker``. Handlers are registered with ``@task`` and are
+looked up by name, so only the name and keyword arguments travel over Redis.
+With ``REDIS_URL=memory://`` jobs run as background tasks of the enqueuing
+process instead.
+
+Delivery is at least once. A worker moves each job into its own processing
+list (BLMOVE) and removes it only once the job has run. Workers refresh a
+liveness key every ``JOB_QUEUE_CONSUMER_TTL / 3`` seconds, and any worker
+that finds another's key expired moves that worker's unfinished jobs back
+onto the queue. A job can therefore run twice; ``fire_trigger`` stores its
+event under the id the API returned, so a second run fails instead of
+storing a duplicate.
+
+Scheduler wakeups are broadcast over pub/sub rather than queued: a queued
+message reaches one consumer on one worker, usually not the leader.
+"""
+import asyncio
+import json
+import logging
+import uuid
+from redis.exceptions import RedisError
+from ..core.cache import get_redis
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..schemas.event import EventCreate
+from .event_manager import create_event
+from .scheduler import scheduler
+
+logger = logging.getLogger(__name__)
+
+# Shares the cache's connection pool
+redis_client = get_redis()
+
+TASKS = {}
+
+WAKEUP_CHANNEL = "scheduler:wakeup"
+CONSUMERS_KEY = f"{settings.JOB_QUEUE_KEY}:consumers"
+
+# In-process jobs, referenced until they finish so they aren't garbage collected
+_local_jobs = set()
+
+def task(name: str):
+    """Register an async handler under name"""
+    def register(func):
+        TASKS[name] = func
+        return func
+    return register
+
+async def enqueue(name: str, **kwargs):
+    """Queue a job for the worker pool"""
+    if name not in TASKS:
+        raise ValueError(f"Unknown task: {name}")
+    message = json.dumps({"task": name, "kwargs": kwargs})
+    if redis_client is None:
+        job = asyncio.create_task(run_job(message))
+        _local_jobs.add(job)
+        job.add_done_callback(_local_jobs.discard)
+        return
+    await redis_client.lpush(settings.JOB_QUEUE_KEY, message)
+
+async def notify_scheduler():
+    """Tell workers the jobstore changed so they don't wait for their next poll"""
+    if settings.RUN_SCHEDULER:
+        # The local scheduler already saw the change
+        return
+    if redis_client is None:
+        if scheduler.running:
+            scheduler.wakeup()
+        return
+    try:
+        await redis_client.publish(WAKEUP_CHANNEL, "1")
+    except RedisError:
+        # The change is already committed; workers pick it up on their next poll
+        logger.exception("Scheduler wakeup failed")
+
+async def listen_for_wakeups(stop):
+    """Wake the local scheduler on every notify_scheduler until stop is set
+
+    Paused (non-leader) schedulers ignore the wakeup. Messages sent while
+    the subscription is down are lost, the jobstore poll covers for them.
+    """
+    if redis_client is None:
+        await stop.wait()
+        return
+    while not stop.is_set():
+        pubsub = redis_client.pubsub()
+        try:
+            await pubsub.subscribe(WAKEUP_CHANNEL)
+            while not stop.is_set():
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message and scheduler.running:
+                    scheduler.wakeup()
+        except Exception:
+            logger.exception("Scheduler wakeup subscription failed, resubscribing")
+            await asyncio.sleep(1)
+        finally:
+            await pubsub.aclose()
+
+async def run_job(message: str):
+    """Decode and run a single queued job, logging instead of raising"""
+    try:
+        job = json.loads(message)
+        await TASKS[job["task"]](**job.get("kwargs", {}))
+    except Exception:
+        logger.exception("Job failed: %s", message)
+
+def _processing_key(consumer: str) -> str:
+    return f"{settings.JOB_QUEUE_KEY}:processing:{consumer}"
+
+def _alive_key(consumer: str) -> str:
+    return f"{settings.JOB_QUEUE_KEY}:alive:{consumer}"
+
+async def consume(stop, consumer: str):
+    """Take and run jobs until the stop event is set"""
+    if redis_client is None:
+        # Jobs never leave their process, there is no queue to consume
+        await stop.wait()
+        return
+    processing = _processing_key(consumer)
+    while not stop.is_set():
+        try:
+            message = await redis_client.blmove(settings.JOB_QUEUE_KEY, processing, 1, "RIGHT", "LEFT")
+        except RedisError:
+            logger.exception("Job queue unavailable, retrying")
+            await asyncio.sleep(1)
+            continue
+        if message is None:
+            continue
+        await run_job(message)
+        try:
+            await redis_client.lrem(processing, 1, message)
+        except RedisError:
+            # It stays claimed and runs again once this worker is gone
+            logger.exception("Could not mark job done: %s", message)
+
+async def requeue_jobs(consumer: str) -> int:
+    """Move consumer's unfinished jobs back onto the queue"""
+    moved = 0
+    while await redis_client.lmove(_processing_key(consumer), settings.JOB_QUEUE_KEY, "RIGHT", "RIGHT"):
+        moved += 1
+    if moved:
+        logger.warning("Requeued %d unfinished jobs of %s", moved, consumer)
+    return moved
+
+async def track_consumers(stop, consumer: str):
+    """Keep consumer marked alive and requeue the jobs of dead consumers"""
+    if redis_client is None:
+        await stop.wait()
+        return
+    ttl = settings.JOB_QUEUE_CONSUMER_TTL
+    while not stop.is_set():
+        try:
+            await redis_client.set(_alive_key(consumer), 1, ex=ttl)
+            await redis_client.sadd(CONSUMERS_KEY, consumer)
+            for other in await redis_client.smembers(CONSUMERS_KEY):
+                other = other.decode()
+                if other != consumer and not await redis_client.exists(_alive_key(other)):
+                    await requeue_jobs(other)
+                    await redis_client.srem(CONSUMERS_KEY, other)
+        except RedisError:
+            logger.exception("Job queue consumer heartbeat failed")
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=ttl / 3)
+        except asyncio.TimeoutError:
+            pass
+
+@task("fire_trigger")
+async def fire_trigger(trigger_id: str, event_id: str, is_test: bool = False):
+    db = SessionLocal()
+    try:
+        await create_event(
+            db,
+            EventCreate(trigger_id=trigger_id, is_test=is_test),
+            event_id=uuid.UUID(event_id)
+        )
+    finally:
+        db.close()
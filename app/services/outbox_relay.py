@@ -0,0 +1,93 @@
+"""Relay that drains the event outbox into Redis Streams.
+
+Run one or more relays alongside the API:
+
+    python -m app.services.outbox_relay
+
+Each relay claims a batch of outbox rows with ``FOR UPDATE SKIP LOCKED``,
+publishes them with a single pipelined round of ``XADD`` calls and deletes
+them in the same transaction. A row is only deleted after Redis acknowledged
+the whole pipeline, so delivery is at-least-once: if the relay dies between
+``XADD`` and commit the batch is published again, and consumers should
+de-duplicate on ``event_id``. Rolled back events never reach the outbox, so
+there are no phantom messages.
+"""
+import json
+import logging
+import time
+from redis import Redis
+from redis.exceptions import RedisError
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..models.outbox import OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+def _stream_fields(message: OutboxMessage) -> dict:
+    # Stream entries are flat string maps; the event payload travels as JSON.
+    # Writers put the event's triggered_at in the payload; created_at is only
+    # a fallback for rows queued by versions that didn't
+    triggered_at = message.payload.get("triggered_at")
+    if triggered_at is None and message.created_at is not None:
+        triggered_at = message.created_at.isoformat()
+    return {
+        "event_id": str(message.event_id),
+        "trigger_id": str(message.trigger_id),
+        "triggered_at": triggered_at or "",
+        "is_test": "1" if message.payload.get("is_test") else "0",
+        "payload": json.dumps(message.payload.get("payload")),
+    }
+
+def relay_batch(db: Session, redis_client: Redis, batch_size: int = None) -> int:
+    """Publish one batch of pending outbox messages, returning how many were sent"""
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    try:
+        messages = db.query(OutboxMessage).order_by(
+            OutboxMessage.id
+        ).limit(batch_size).with_for_update(skip_locked=True).all()
+        if not messages:
+            db.rollback()
+            return 0
+
+        pipe = redis_client.pipeline(transaction=False)
+        for message in messages:
+            pipe.xadd(
+                message.stream,
+                _stream_fields(message),
+                maxlen=settings.OUTBOX_STREAM_MAXLEN,
+                approximate=True
+            )
+        pipe.execute()
+
+        db.query(OutboxMessage).filter(
+            OutboxMessage.id.in_([message.id for message in messages])
+        ).delete(synchronize_session=False)
+        db.commit()
+        return len(messages)
+    except Exception:
+        db.rollback()
+        raise
+
+def run_relay(poll_interval: float = None):
+    """Drain the outbox forever, sleeping only when it is empty"""
+    poll_interval = poll_interval or settings.OUTBOX_POLL_INTERVAL
+    redis_client = Redis.from_url(settings.REDIS_URL, decode_responses=True)
+    db = SessionLocal()
+    try:
+        while True:
+            try:
+                sent = relay_batch(db, redis_client)
+            except (RedisError, SQLAlchemyError) as e:
+                logger.warning("Outbox relay batch failed, retrying: %s", e)
+                sent = 0
+            # A full batch means there is probably more backlog waiting
+            if sent < settings.OUTBOX_BATCH_SIZE:
+                time.sleep(poll_interval)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    run_relay()
@@ -0,0 +1,158 @@
+"""Next-fire-time index for scheduled triggers.
+
+Every scheduled trigger stores the next time it is due in
+``triggers.next_fire_at``. The column is refreshed when a trigger is created,
+updated or fired, which lets the upcoming-firings report work from a couple
+of grouped, indexed queries instead of running croniter on every trigger.
+"""
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Optional
+from croniter import croniter
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from ..models.trigger import Trigger
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+def parse_schedule(schedule: str) -> datetime:
+    """Parse a one-time trigger's ISO 8601 schedule, treating naive times as UTC"""
+    run_date = datetime.fromisoformat(schedule.replace("Z", "+00:00"))
+    if run_date.tzinfo is None:
+        run_date = run_date.replace(tzinfo=timezone.utc)
+    return run_date
+
+def next_cron_time(pattern: str, after: datetime) -> datetime:
+    """Next time pattern fires after `after`"""
+    return croniter(pattern, after).get_next(datetime)
+
+def next_fire_time(trigger, after: datetime = None) -> Optional[datetime]:
+    """Next time trigger is due strictly after `after`, or None if never"""
+    after = after or utcnow()
+    if trigger.type != "scheduled":
+        return None
+    if trigger.recurring and trigger.recurring_pattern:
+        return next_cron_time(trigger.recurring_pattern, after)
+    if trigger.schedule:
+        try:
+            run_date = parse_schedule(trigger.schedule)
+        except ValueError:
+            return None
+        return run_date if run_date > after else None
+    return None
+
+def _minute_ceil(moment: datetime) -> datetime:
+    floor = moment.replace(second=0, microsecond=0)
+    return floor if floor == moment else floor + timedelta(minutes=1)
+
+@lru_cache(maxsize=4096)
+def _expand(pattern: str) -> Optional[tuple]:
+    """Sorted minutes and hours plus day, month and weekday sets of a plain cron pattern.
+
+    None for patterns using L, #n and friends, which croniter has to walk.
+    """
+    fields, nth_weekday = croniter.expand(pattern)
+    simple = len(fields) == 5 and not nth_weekday and all(
+        value == "*" or isinstance(value, int) for field in fields for value in field
+    )
+    if not simple:
+        return None
+    minutes, hours = (
+        tuple(range(limit)) if field == ["*"] else tuple(sorted(set(field)))
+        for field, limit in zip(fields[:2], (60, 24))
+    )
+    day_set, month_set, dow_set = (
+        None if field == ["*"] else set(field) for field in fields[2:]
+    )
+    dow_set = dow_set and {value % 7 for value in dow_set}
+    return minutes, hours, day_set, month_set, dow_set
+
+def _day_matches(day: datetime, day_set, month_set, dow_set) -> bool:
+    if month_set is not None and day.month not in month_set:
+        return False
+    day_match = day_set is None or day.day in day_set
+    dow_match = dow_set is None or (day.weekday() + 1) % 7 in dow_set
+    # Like cron, a restricted day-of-month and day-of-week match on either
+    if day_set is not None and dow_set is not None:
+        return day_match or dow_match
+    return day_match and dow_match
+
+def _pattern_offsets(pattern: str, start: datetime, minutes: int) -> list:
+    """Minute offsets from start (a whole minute) at which pattern fires"""
+    end = start + timedelta(minutes=minutes)
+    expanded = _expand(pattern)
+    if expanded is None:
+        iterator = croniter(pattern, start - timedelta(seconds=1))
+        offsets = []
+        while (fire_at := iterator.get_next(datetime)) < end:
+            offsets.append(int((fire_at - start).total_seconds() // 60))
+        return offsets
+
+    # Only the matching days of the window are visited, and on those only the
+    # pattern's own hours and minutes, so the work is that of the firings
+    minute_values, hour_values, day_set, month_set, dow_set = expanded
+    offsets = []
+    day = start.replace(hour=0, minute=0)
+    while day < end:
+        if _day_matches(day, day_set, month_set, dow_set):
+            base = int((day - start).total_seconds() // 60)
+            for hour in hour_values:
+                for minute in minute_values:
+                    offset = base + hour * 60 + minute
+                    if 0 <= offset < minutes:
+                        offsets.append(offset)
+        day += timedelta(days=1)
+    return offsets
+
+def upcoming_firings(db: Session, window_minutes: int, now: datetime = None) -> dict:
+    """Per-minute fire counts for active scheduled triggers over the next window"""
+    now = now or utcnow()
+    # Cron fires on whole minutes, so the window starts at the next one
+    start = _minute_ceil(now)
+    end = start + timedelta(minutes=window_minutes)
+    buckets = Counter()
+
+    due_soon = (
+        Trigger.type == "scheduled",
+        Trigger.is_active.is_(True),
+        Trigger.next_fire_at.isnot(None),
+        Trigger.next_fire_at < end,
+    )
+
+    # Triggers sharing a pattern fire together, so expand each pattern once
+    patterns = db.query(
+        Trigger.recurring_pattern,
+        func.count(Trigger.id)
+    ).filter(
+        *due_soon,
+        Trigger.recurring.is_(True)
+    ).group_by(Trigger.recurring_pattern).all()
+    for pattern, count in patterns:
+        for offset in _pattern_offsets(pattern, start, window_minutes):
+            buckets[offset] += count
+
+    one_time = db.query(Trigger.next_fire_at).filter(
+        *due_soon,
+        Trigger.recurring.isnot(True),
+        Trigger.next_fire_at >= start
+    ).all()
+    for (fire_at,) in one_time:
+        if fire_at.tzinfo is None:
+            fire_at = fire_at.replace(tzinfo=timezone.utc)
+        buckets[int((fire_at - start).total_seconds() // 60)] += 1
+
+    histogram = [
+        {"minute": start + timedelta(minutes=offset), "count": buckets[offset]}
+        for offset in sorted(buckets)
+        if 0 <= offset < window_minutes
+    ]
+    return {
+        "window_minutes": window_minutes,
+        "start": start,
+        "end": end,
+        "total": sum(bucket["count"] for bucket in histogram),
+        "histogram": histogram,
+        "peaks": sorted(histogram, key=lambda bucket: bucket["count"], reverse=True)[:5],
+    }
@@ -1,27 +1,199 @@
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
+import asyncio
+import logging
+import pickle
+from datetime import datetime, timedelta, timezone
+from apscheduler.executors.asyncio import AsyncIOExecutor
+from apscheduler.schedulers.asyncio import AsyncIOScheduler, run_in_event_loop
+from apscheduler.jobstores.base import JobLookupError
 from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+from apscheduler.util import datetime_to_utc_timestamp
+from sqlalchemy import bindparam, select
 from ..core.config import settings
+from ..core.database import engine
+from .catchup import run_catch_up
 
-scheduler = AsyncIOScheduler(
+logger = logging.getLogger(__name__)
+
+class _LoopSafeExecutor(AsyncIOExecutor):
+    """AsyncIOExecutor that accepts jobs from outside the event loop"""
+
+    def _do_submit_job(self, job, run_times):
+        self._eventloop.call_soon_threadsafe(super()._do_submit_job, job, run_times)
+
+class ThreadedAsyncIOScheduler(AsyncIOScheduler):
+    """AsyncIOScheduler whose jobstore passes run in a worker thread
+
+    The stock scheduler looks up due jobs and rewrites each one's
+    next_run_time on the event loop, one blocking UPDATE per job; a minute
+    with a thousand due jobs stalled requests for seconds. Here only the
+    jobs themselves run on the loop. Wakeups that arrive during a pass
+    start another pass once it finishes.
+    """
+    _pass = None
+    _wakeup_pending = False
+
+    @run_in_event_loop
+    def wakeup(self):
+        self._stop_timer()
+        if self._pass is not None:
+            self._wakeup_pending = True
+            return
+        self._pass = self._eventloop.run_in_executor(None, self._process_jobs)
+        self._pass.add_done_callback(self._pass_done)
+
+    def _pass_done(self, future):
+        self._pass = None
+        try:
+            wait_seconds = future.result()
+        except Exception:
+            logger.exception("Scheduler jobstore pass failed")
+            wait_seconds = self.jobstore_retry_interval
+        if self._wakeup_pending:
+            self._wakeup_pending = False
+            wait_seconds = 0
+        self._start_timer(wait_seconds)
+
+    def _create_default_executor(self):
+        return _LoopSafeExecutor()
+
+# Sharing the app's engine keeps the jobstore on the same pool (and, on
+# SQLite, the same WAL pragmas)
+jobstore = SQLAlchemyJobStore(engine=engine)
+
+scheduler = ThreadedAsyncIOScheduler(
     jobstores={
-        'default': SQLAlchemyJobStore(url=settings.DATABASE_URL)
-    }
+        'default': jobstore
+    },
+    # APScheduler's default of 1s drops a job whenever the scheduler learns
+    # about it, or gets to it, a moment late
+    job_defaults={
+        'misfire_grace_time': settings.SCHEDULER_MISFIRE_GRACE_SECONDS
+    },
+    # Cron patterns and naive run dates are UTC, like next_fire_at and
+    # everything computed from it, whatever the host's zone
+    timezone=timezone.utc
 )
 
-def init_scheduler():
-    # Event cleanup jobs
-    scheduler.add_job(
-        'app.services.event_manager:archive_old_events',
-        'interval',
-        minutes=30,
-        id='archive_old_events'
-    )
-    
-    scheduler.add_job(
-        'app.services.event_manager:delete_old_events',
-        'interval',
-        hours=24,
-        id='delete_old_events'
-    )
-    
-    scheduler.start()
\ No newline at end of file
+# Set once the scheduler has started and, if it fires, resumed and caught up
+# on the runs it missed
+scheduler_hydrated = asyncio.Event()
+
+RETENTION_JOBS = [
+    {
+        'id': 'delete_old_events',
+        'func': 'app.services.event_manager:delete_old_events',
+        'trigger': 'interval',
+        'hours': 24
+    }
+]
+
+def register_retention_jobs():
+    """Upsert the retention jobs into the jobstore"""
+    # replace_existing upserts instead of a remove + add round trip each
+    for job in RETENTION_JOBS:
+        scheduler.add_job(
+            job['func'],
+            job['trigger'],
+            id=job['id'],
+            replace_existing=True,
+            **{k: v for k, v in job.items() if k not in ['id', 'func', 'trigger']}
+        )
+
+# Jobs that no longer exist but may still be persisted in the jobstore;
+# archive_old_events went away when event status became derived from age
+RETIRED_JOBS = ['archive_old_events']
+
+def remove_retired_jobs():
+    for job_id in RETIRED_JOBS:
+        try:
+            scheduler.remove_job(job_id)
+        except JobLookupError:
+            pass
+
+# Jobs restored, rewritten and committed at a time by fast_forward_jobs.
+# Holding every overdue job at once makes each garbage collection walk all
+# of them, which holds the GIL long enough to stall the event loop.
+FAST_FORWARD_BATCH = 1000
+
+def fast_forward_jobs():
+    """Move jobs overdue beyond the misfire grace to their first run inside it
+
+    The scheduler would skip those runs as misfired anyway, but only after
+    restoring and rewriting every such job one UPDATE at a time; after an
+    outage that keeps it from firing anything due now for as long as it
+    takes. This does the same with one executemany per batch before the
+    scheduler resumes. The skipped runs are left to catch-up.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=settings.SCHEDULER_MISFIRE_GRACE_SECONDS)
+    jobs = jobstore.jobs_t
+    # Matching next_run_time leaves jobs alone that were rescheduled meanwhile
+    unchanged = (jobs.c.id == bindparam("job_id")) & (jobs.c.next_run_time == bindparam("due_at"))
+    overdue = select(jobs.c.id, jobs.c.next_run_time, jobs.c.job_state).where(
+        jobs.c.next_run_time <= datetime_to_utc_timestamp(cutoff)
+    ).order_by(jobs.c.id).limit(FAST_FORWARD_BATCH)
+
+    moved = 0
+    last_id = None
+    while True:
+        with jobstore.engine.begin() as connection:
+            query = overdue if last_id is None else overdue.where(jobs.c.id > last_id)
+            rows = connection.execute(query).all()
+            if not rows:
+                return moved
+            last_id = rows[-1].id
+            updates, removals = [], []
+            for row in rows:
+                job = jobstore._reconstitute_job(row.job_state)
+                next_run = job.trigger.get_next_fire_time(None, cutoff)
+                if next_run is None or next_run < cutoff:
+                    removals.append({"job_id": row.id, "due_at": row.next_run_time})
+                    continue
+                job._modify(next_run_time=next_run)
+                updates.append({
+                    "job_id": row.id,
+                    "due_at": row.next_run_time,
+                    "run_at": datetime_to_utc_timestamp(next_run),
+                    "state": pickle.dumps(job.__getstate__(), jobstore.pickle_protocol)
+                })
+            if updates:
+                connection.execute(
+                    jobs.update().where(unchanged).values(
+                        next_run_time=bindparam("run_at"), job_state=bindparam("state")
+                    ),
+                    updates
+                )
+            if removals:
+                connection.execute(jobs.delete().where(unchanged), removals)
+            moved += len(rows)
+
+async def resume_firing():
+    """Start firing stored jobs and catch up on the runs they missed"""
+    await asyncio.to_thread(fast_forward_jobs)
+    await asyncio.to_thread(register_retention_jobs)
+    # The first jobstore pass now only sees runs inside the grace window
+    scheduler.resume()
+    await asyncio.to_thread(run_catch_up)
+
+async def init_scheduler(paused: bool = False):
+    """Start processing stored jobs
+
+    A paused scheduler never fires anything but still writes add_job and
+    remove_job calls straight to the jobstore, which is how API processes
+    manage trigger schedules while a separate worker runs them. A scheduler
+    that is going to fire then materializes the firings missed while none
+    was running and now too late for it to run.
+    """
+    # The jobstore's table check is blocking I/O, keep it off the event loop
+    await asyncio.to_thread(jobstore.jobs_t.create, jobstore.engine, True)
+    if not scheduler.running:
+        scheduler.start(paused=True)
+    await asyncio.to_thread(remove_retired_jobs)
+    if not paused:
+        await resume_firing()
+    scheduler_hydrated.set()
+
+async def hydrate_scheduler(paused: bool = False):
+    """Start the scheduler in the background once the server is serving"""
+    # Let the startup hook return so uvicorn starts accepting connections
+    await asyncio.sleep(0)
+    await init_scheduler(paused=paused)
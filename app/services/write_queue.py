@@ -0,0 +1,87 @@
+"""Single-writer queue that batches event writes on SQLite.
+
+SQLite allows one writer at a time, so concurrent request sessions each
+committing their own insert mostly wait on the database lock. Instead, event
+writes are handed to one background thread that drains whatever is queued,
+up to ``EVENT_WRITE_BATCH_SIZE`` jobs, and applies it in a single
+transaction. Callers await a future that resolves once their write is
+committed.
+
+A job is a function that stages writes on the session it is given and
+returns the value to hand back to its caller. If a batch fails to commit,
+its jobs are retried one transaction each so one bad row only fails its own
+caller.
+"""
+import asyncio
+import logging
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable
+from sqlalchemy.orm import Session, sessionmaker
+from ..core.config import settings
+from ..core.database import engine
+
+logger = logging.getLogger(__name__)
+
+# expire_on_commit=False keeps staged objects readable after the writer
+# commits; they are detached before being handed back to callers
+WriterSession = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+class EventWriter:
+    def __init__(self, max_batch: int):
+        self.max_batch = max_batch
+        self._jobs = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="event-writer", daemon=True)
+                self._thread.start()
+
+    async def submit(self, job: Callable[[Session], Any]) -> Any:
+        """Queue job and wait until its writes are committed"""
+        self._ensure_started()
+        future = Future()
+        self._jobs.put((job, future))
+        return await asyncio.wrap_future(future)
+
+    def _run(self):
+        while True:
+            batch = [self._jobs.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._jobs.get_nowait())
+                except queue.Empty:
+                    break
+            # Skip writes whose callers stopped waiting before they ran
+            batch = [item for item in batch if item[1].set_running_or_notify_cancel()]
+            if batch:
+                self._write(batch)
+
+    def _write(self, batch: list):
+        db = WriterSession()
+        error = None
+        try:
+            results = [job(db) for job, _ in batch]
+            db.commit()
+            db.expunge_all()
+        except Exception as e:
+            db.rollback()
+            error = e
+        finally:
+            db.close()
+
+        if error is None:
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+        elif len(batch) == 1:
+            batch[0][1].set_exception(error)
+        else:
+            logger.warning("Batched event write failed, retrying %d writes one by one", len(batch))
+            for item in batch:
+                self._write([item])
+
+event_writer = EventWriter(settings.EVENT_WRITE_BATCH_SIZE)
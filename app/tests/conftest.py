@@ -0,0 +1,23 @@
+import os
+import tempfile
+
+# Settings are read at import time, so point the app at a throwaway SQLite
+# database before anything under app/ is imported
+_database = os.path.join(tempfile.mkdtemp(), "test.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_database}")
+os.environ.setdefault("REDIS_URL", "memory://")
+os.environ.setdefault("SECRET_KEY", "test")
+
+import pytest
+from app.core.database import Base, SessionLocal, engine
+from app.models import event, outbox, trigger, trigger_stats  # noqa: F401 - register tables
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
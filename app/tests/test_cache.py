@@ -0,0 +1,155 @@
+import asyncio
+import pytest
+from app.core import cache
+from app.core.cache import LocalCache, get_or_set, jittered
+
+@pytest.fixture(autouse=True)
+def clean_cache():
+    cache.local_cache.clear()
+    yield
+    cache.local_cache.clear()
+    assert cache._inflight == {}
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    return now
+
+def test_lru_evicts_least_recently_used():
+    local = LocalCache(2, 60)
+    local.set("a", 1)
+    local.set("b", 2)
+    local.get("a")
+    local.set("c", 3)
+
+    assert local.get("b") is None
+    assert (local.get("a"), local.get("c")) == (1, 3)
+
+def test_entries_expire_after_the_shorter_ttl(clock):
+    local = LocalCache(10, 60)
+    local.set("short", 1, ttl=5)
+    local.set("long", 2, ttl=600)
+
+    clock[0] += 6
+    assert local.get("short") is None
+    assert local.get("long") == 2
+    clock[0] += 60
+    assert local.get("long") is None
+
+def test_zero_maxsize_stores_nothing():
+    local = LocalCache(0, 60)
+    local.set("a", 1)
+
+    assert local.get("a") is None
+
+def test_jittered_ttl_stays_within_spread(monkeypatch):
+    monkeypatch.setattr(cache.settings, "CACHE_TTL_JITTER", 0.1)
+    ttls = {jittered(1000) for _ in range(200)}
+
+    assert min(ttls) >= 900 and max(ttls) <= 1100
+    assert len(ttls) > 1
+    assert jittered(1) == 1
+
+def test_jitter_disabled_keeps_ttl(monkeypatch):
+    monkeypatch.setattr(cache.settings, "CACHE_TTL_JITTER", 0)
+
+    assert jittered(1000) == 1000
+
+def test_memory_mode_keeps_entries_in_process():
+    async def scenario():
+        await cache.cache_set("k", {"v": 1}, expire=1)
+        await cache.set_many({"a": 1, "b": 2})
+        found = (await cache.cache_get("k"), await cache.get_many(["a", "b", "c"]))
+        await cache.cache_delete("k")
+        return found + (await cache.cache_get("k"),)
+
+    assert cache.get_redis() is None
+    assert cache.local_cache.ttl == float("inf")
+    assert asyncio.run(scenario()) == ({"v": 1}, {"a": 1, "b": 2}, None)
+
+def test_get_or_set_runs_loader_once_for_concurrent_misses():
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"n": len(calls)}
+
+    async def scenario():
+        return await asyncio.gather(*(get_or_set("key", loader) for _ in range(5)))
+
+    results = asyncio.run(scenario())
+
+    assert calls == [1]
+    assert results == [{"n": 1}] * 5
+    assert cache.local_cache.get("key") == {"n": 1}
+
+def test_get_or_set_waiters_get_the_loader_error():
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def scenario():
+        return await asyncio.gather(*(get_or_set("key", loader) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+
+    assert calls == [1]
+    assert all(isinstance(result, ValueError) for result in results)
+    assert cache.local_cache.get("key") is None
+
+def test_get_or_set_retries_after_failure():
+    async def failing():
+        raise ValueError("boom")
+
+    async def loader():
+        return 42
+
+    async def scenario():
+        with pytest.raises(ValueError):
+            await get_or_set("key", failing)
+        return await get_or_set("key", loader)
+
+    assert asyncio.run(scenario()) == 42
+
+def test_get_or_set_waiter_reloads_when_leader_is_cancelled():
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.05 if len(calls) == 1 else 0)
+        return len(calls)
+
+    async def scenario():
+        leader = asyncio.create_task(get_or_set("key", loader))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(get_or_set("key", loader))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await waiter
+
+    assert asyncio.run(scenario()) == 2
+    assert calls == [1, 1]
+
+def test_get_or_set_cancelled_waiter_leaves_load_running():
+    async def loader():
+        await asyncio.sleep(0.02)
+        return "value"
+
+    async def scenario():
+        leader = asyncio.create_task(get_or_set("key", loader))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(get_or_set("key", loader))
+        await asyncio.sleep(0.005)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        return await leader
+
+    assert asyncio.run(scenario()) == "value"
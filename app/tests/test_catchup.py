@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+from app.models.event import Event
+from app.models.trigger import Trigger
+from app.services.catchup import catch_up_missed_firings, missed_fire_times, run_catch_up
+from app.services.schedule_index import utcnow
+
+NOW = datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc)
+
+def _utc(moment):
+    # SQLite hands back naive datetimes
+    return moment.replace(tzinfo=timezone.utc) if moment.tzinfo is None else moment
+
+def _add_trigger(db, policy, next_fire_at, pattern="*/10 * * * *", schedule=None):
+    trigger = Trigger(
+        type="scheduled",
+        recurring=schedule is None,
+        recurring_pattern=pattern if schedule is None else None,
+        schedule=schedule,
+        catchup_policy=policy,
+        next_fire_at=next_fire_at
+    )
+    db.add(trigger)
+    db.commit()
+    return trigger
+
+def _fired_at(db, trigger):
+    events = db.query(Event).filter(Event.trigger_id == trigger.id).order_by(Event.triggered_at)
+    return [_utc(event.triggered_at) for event in events]
+
+def test_missed_fire_times_covers_since_up_to_now_oldest_first():
+    since = NOW - timedelta(hours=1)
+    times = missed_fire_times("*/10 * * * *", since, NOW, 100)
+    assert times == tuple(since + timedelta(minutes=10 * i) for i in range(6))
+
+def test_missed_fire_times_keeps_newest_when_limited():
+    times = missed_fire_times("*/10 * * * *", NOW - timedelta(hours=1), NOW, 2)
+    assert times == (NOW - timedelta(minutes=20), NOW - timedelta(minutes=10))
+
+def test_missed_fire_times_empty_when_nothing_due():
+    assert missed_fire_times("0 0 * * *", NOW - timedelta(hours=1), NOW, 10) == ()
+
+def test_skip_drops_missed_runs_and_advances_index(db):
+    trigger = _add_trigger(db, "skip", NOW - timedelta(hours=1))
+
+    summary = catch_up_missed_firings(db, now=NOW)
+
+    assert summary == {"triggers": 1, "events": 0, "skipped": 1}
+    assert _fired_at(db, trigger) == []
+    db.refresh(trigger)
+    assert _utc(trigger.next_fire_at) == NOW
+
+def test_coalesce_materializes_most_recent_missed_run(db):
+    trigger = _add_trigger(db, "coalesce", NOW - timedelta(hours=1))
+
+    catch_up_missed_firings(db, now=NOW)
+
+    assert _fired_at(db, trigger) == [NOW - timedelta(minutes=10)]
+    db.refresh(trigger)
+    assert _utc(trigger.next_fire_at) == NOW
+
+def test_backfill_materializes_every_missed_run(db):
+    trigger = _add_trigger(db, "backfill", NOW - timedelta(hours=1))
+
+    summary = catch_up_missed_firings(db, now=NOW)
+
+    assert summary["events"] == 6
+    assert _fired_at(db, trigger) == [NOW - timedelta(minutes=60 - 10 * i) for i in range(6)]
+
+@pytest.mark.parametrize("policy, expected", [("skip", 0), ("coalesce", 1), ("backfill", 1)])
+def test_one_time_trigger_fires_at_most_once(db, policy, expected):
+    run_date = NOW - timedelta(hours=3)
+    trigger = _add_trigger(db, policy, run_date, schedule=run_date.isoformat())
+
+    catch_up_missed_firings(db, now=NOW)
+
+    assert _fired_at(db, trigger) == [run_date] * expected
+    db.refresh(trigger)
+    assert trigger.next_fire_at is None
+
+def test_run_catch_up_leaves_runs_within_grace_to_the_scheduler(db):
+    due = utcnow() - timedelta(seconds=5)
+    trigger = _add_trigger(db, "backfill", due, pattern="* * * * *")
+
+    run_catch_up()
+
+    assert _fired_at(db, trigger) == []
+    db.refresh(trigger)
+    assert _utc(trigger.next_fire_at) == due.replace(tzinfo=timezone.utc)
+
+def test_run_catch_up_materializes_runs_beyond_grace(db):
+    due = (utcnow() - timedelta(hours=1)).replace(second=0, microsecond=0)
+    trigger = _add_trigger(db, "coalesce", due, pattern="*/10 * * * *")
+
+    summary = run_catch_up()
+
+    assert summary["events"] == 1
+    assert len(_fired_at(db, trigger)) == 1
+    db.refresh(trigger)
+    assert _utc(trigger.next_fire_at) > utcnow() - timedelta(minutes=11)
@@ -0,0 +1,89 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+import pytest
+from app.models.event import Event, event_status
+from app.models.trigger import Trigger
+from app.schemas.event import Event as EventSchema
+from app.services import event_manager
+from app.services.event_manager import get_aggregated_events, get_events
+
+NOW = datetime.now(timezone.utc).replace(microsecond=0)
+CUTOFF = NOW - timedelta(hours=2)
+
+@pytest.fixture
+def fixed_cutoff(monkeypatch):
+    monkeypatch.setattr(event_manager, "archive_cutoff", lambda now=None: CUTOFF)
+
+@pytest.fixture
+def trigger(db):
+    trigger = Trigger(type="api")
+    db.add(trigger)
+    db.commit()
+    return trigger
+
+def _add_events(db, trigger, *events):
+    for triggered_at, status in events:
+        db.add(Event(trigger_id=trigger.id, triggered_at=triggered_at, status=status))
+    db.commit()
+
+def _statuses(db, status):
+    events = asyncio.run(get_events(db, status=status))
+    return sorted(event.triggered_at.replace(tzinfo=timezone.utc) for event in events)
+
+def test_event_status_boundary_and_override():
+    assert event_status(CUTOFF, cutoff=CUTOFF) == "archived"
+    assert event_status(CUTOFF + timedelta(microseconds=1), cutoff=CUTOFF) == "active"
+    assert event_status(CUTOFF.replace(tzinfo=None), cutoff=CUTOFF) == "archived"
+    assert event_status(NOW, "archived", cutoff=CUTOFF) == "archived"
+
+def test_get_events_splits_at_cutoff(db, trigger, fixed_cutoff):
+    at_cutoff = CUTOFF
+    just_after = CUTOFF + timedelta(microseconds=1)
+    before = CUTOFF - timedelta(seconds=1)
+    _add_events(db, trigger, (before, None), (at_cutoff, None), (just_after, None))
+
+    assert _statuses(db, "archived") == [before, at_cutoff]
+    assert _statuses(db, "active") == [just_after]
+
+def test_get_events_overrides_win(db, trigger, fixed_cutoff):
+    old = CUTOFF - timedelta(hours=1)
+    recent = NOW
+    _add_events(db, trigger, (old, "active"), (recent, "archived"), (recent - timedelta(minutes=1), "failed"))
+
+    assert _statuses(db, "active") == [old]
+    assert _statuses(db, "archived") == [recent]
+    assert _statuses(db, "failed") == [recent - timedelta(minutes=1)]
+
+def test_aggregate_groups_by_derived_status(db, trigger, fixed_cutoff):
+    _add_events(
+        db, trigger,
+        (CUTOFF - timedelta(minutes=30), None),
+        (CUTOFF, None),
+        (NOW - timedelta(minutes=5), None),
+        (NOW - timedelta(minutes=1), None),
+        (NOW, "archived"),
+        (CUTOFF - timedelta(hours=100), None),
+    )
+
+    rows = asyncio.run(get_aggregated_events(db, hours=48))
+
+    counts = {row.status: row.count for row in rows}
+    assert counts == {"archived": 3, "active": 2}
+    assert {row.trigger_id for row in rows} == {trigger.id}
+
+def test_schema_derives_status_from_dict():
+    data = {"id": uuid.uuid4(), "trigger_id": uuid.uuid4(), "triggered_at": NOW - timedelta(hours=3)}
+
+    assert EventSchema.model_validate(data).status == "archived"
+    assert EventSchema.model_validate({**data, "triggered_at": NOW}).status == "active"
+    assert EventSchema.model_validate({**data, "status": "failed"}).status == "failed"
+
+def test_schema_derives_status_from_orm_without_mutating_it():
+    event = Event(id=uuid.uuid4(), trigger_id=uuid.uuid4(), triggered_at=NOW, is_test=False)
+
+    assert EventSchema.model_validate(event).status == "active"
+    assert event.status is None
+
+    event.status = "archived"
+    assert EventSchema.model_validate(event).status == "archived"
@@ -0,0 +1,179 @@
+import asyncio
+import random
+import time
+import uuid
+import pytest
+from app.models.trigger_stats import TriggerStatsCheckpoint
+from app.services import firing_stats
+from app.services.firing_stats import (
+    BUCKET_SECONDS, HISTORY_SECONDS, NODE_ID, LogSketch, TriggerStats, checkpoint, get_firing_stats,
+    record_firing
+)
+
+ACCURACY = 0.01
+
+def _exact_quantile(values, q):
+    return sorted(values)[int(q * (len(values) - 1))]
+
+@pytest.fixture
+def clean_stats():
+    firing_stats._stats.clear()
+    firing_stats._dirty.clear()
+    firing_stats._evicted.clear()
+    yield
+    firing_stats._stats.clear()
+    firing_stats._dirty.clear()
+    firing_stats._evicted.clear()
+
+def test_quantiles_within_relative_accuracy():
+    generator = random.Random(1)
+    values = [generator.lognormvariate(0, 2) + LogSketch.MIN_VALUE for _ in range(10_000)]
+    sketch = LogSketch(ACCURACY)
+    for value in values:
+        sketch.add(value)
+
+    for q in (0.0, 0.1, 0.5, 0.9, 0.99, 1.0):
+        exact = _exact_quantile(values, q)
+        assert sketch.quantile(q) == pytest.approx(exact, rel=ACCURACY)
+    assert sketch.count == len(values)
+    assert sketch.min == min(values) and sketch.max == max(values)
+
+def test_values_below_min_value_count_as_zero():
+    sketch = LogSketch()
+    for value in (0.0, 0.0, 0.0, 5.0):
+        sketch.add(value)
+
+    assert sketch.zeros == 3
+    assert sketch.quantile(0.5) == 0.0
+    assert sketch.quantile(1.0) == 5.0
+
+def test_empty_sketch_has_no_quantiles():
+    assert LogSketch().quantile(0.5) is None
+    assert LogSketch().summary() is None
+
+def test_merge_matches_one_sketch_of_all_values():
+    generator = random.Random(2)
+    left_values = [generator.uniform(0.01, 10) for _ in range(2_000)]
+    right_values = [generator.uniform(5, 500) for _ in range(2_000)]
+    left, right, combined = LogSketch(), LogSketch(), LogSketch()
+    for value in left_values:
+        left.add(value)
+        combined.add(value)
+    for value in right_values:
+        right.add(value)
+        combined.add(value)
+
+    left.merge(right)
+
+    assert left.bins == combined.bins
+    assert left.count == combined.count
+    assert left.total == pytest.approx(combined.total)
+    assert (left.min, left.max) == (combined.min, combined.max)
+    assert left.quantile(0.9) == combined.quantile(0.9)
+
+def test_merge_survives_round_trip_through_dict():
+    sketch = LogSketch()
+    for value in (0.5, 1.0, 2.0, 40.0):
+        sketch.add(value)
+
+    restored = LogSketch.from_dict(sketch.to_dict())
+
+    assert restored.bins == sketch.bins
+    assert restored.summary() == sketch.summary()
+
+def test_collapse_bounds_bins_and_keeps_high_quantiles(monkeypatch):
+    monkeypatch.setattr(LogSketch, "MAX_BINS", 64)
+    values = [1.05 ** i for i in range(1_000)]
+    sketch = LogSketch(ACCURACY)
+    for value in values:
+        sketch.add(value)
+
+    assert len(sketch.bins) <= 64
+    assert sum(sketch.bins.values()) == len(values)
+    # Only the low end loses accuracy
+    for q in (0.95, 0.99, 1.0):
+        assert sketch.quantile(q) == pytest.approx(_exact_quantile(values, q), rel=ACCURACY)
+
+def test_merge_collapses_past_max_bins(monkeypatch):
+    monkeypatch.setattr(LogSketch, "MAX_BINS", 32)
+    low, high = LogSketch(), LogSketch()
+    for i in range(30):
+        low.add(1.05 ** i)
+        high.add(1.05 ** (i + 100))
+
+    low.merge(high)
+
+    assert len(low.bins) <= 32
+    assert low.count == 60
+
+def test_rates_count_events_per_window():
+    now = 1_000_000.0
+    stats = TriggerStats()
+    # One event per bucket across the last 20 minutes
+    for age in range(0, 1200, BUCKET_SECONDS):
+        stats.record(now - age)
+
+    rates = stats.rates(now)
+
+    assert rates["1m"] == pytest.approx(6 / 60)
+    assert rates["5m"] == pytest.approx(30 / 300)
+    assert rates["15m"] == pytest.approx(90 / 900)
+    assert rates["1h"] == pytest.approx(120 / 3600)
+
+def test_rates_forget_buckets_older_than_history():
+    now = 1_000_000.0
+    stats = TriggerStats()
+    stats.record(now - HISTORY_SECONDS - 5 * BUCKET_SECONDS)
+    stats.record(now)
+
+    assert all(bucket >= now - HISTORY_SECONDS - BUCKET_SECONDS for bucket in stats.buckets)
+    assert stats.rates(now)["1h"] == pytest.approx(1 / 3600)
+    assert stats.count == 2
+
+def test_record_tracks_inter_arrival_and_delay():
+    stats = TriggerStats()
+    stats.record(100.0, scheduled_at=99.0)
+    stats.record(110.0, scheduled_at=111.0)
+
+    assert stats.inter_arrival.count == 1
+    assert stats.inter_arrival.quantile(0.5) == pytest.approx(10.0, rel=ACCURACY)
+    # Early firings count as on time
+    assert stats.delay.quantile(0.0) == 0.0
+    assert stats.delay.max == 1.0
+
+def test_checkpoint_upserts_and_evicts_idle_triggers(db, clean_stats):
+    idle, busy = uuid.uuid4(), uuid.uuid4()
+    record_firing(idle)
+    record_firing(busy)
+    asyncio.run(checkpoint())
+    assert db.query(TriggerStatsCheckpoint).filter_by(node_id=NODE_ID).count() == 2
+
+    firing_stats._stats[str(idle)].last_at = time.time() - HISTORY_SECONDS - 1
+    record_firing(busy)
+    asyncio.run(checkpoint())
+
+    assert str(idle) not in firing_stats._stats
+    assert str(busy) in firing_stats._stats
+    db.expire_all()
+    stored = db.get(TriggerStatsCheckpoint, (busy, NODE_ID))
+    assert stored.stats["count"] == 2
+    # The evicted trigger is still served from its checkpoint
+    assert get_firing_stats(db, idle)["events"] == 1
+
+def test_evicted_trigger_resumes_from_its_checkpoint(db, clean_stats):
+    trigger_id = uuid.uuid4()
+    record_firing(trigger_id)
+    asyncio.run(checkpoint())
+    firing_stats._stats[str(trigger_id)].last_at = time.time() - HISTORY_SECONDS - 1
+    asyncio.run(checkpoint())
+    assert str(trigger_id) in firing_stats._evicted
+
+    record_firing(trigger_id)
+    assert get_firing_stats(db, trigger_id)["events"] == 2
+    asyncio.run(checkpoint())
+
+    assert firing_stats._stats[str(trigger_id)].count == 2
+    assert not firing_stats._evicted
+    db.expire_all()
+    assert db.get(TriggerStatsCheckpoint, (trigger_id, NODE_ID)).stats["count"] == 2
+    assert get_firing_stats(db, trigger_id)["nodes"] == 1
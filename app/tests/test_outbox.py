@@ -0,0 +1,151 @@
+import asyncio
+import json
+import uuid
+from datetime import datetime, timedelta, timezone
+import pytest
+from redis.exceptions import ConnectionError
+from app.core.config import Settings, settings
+from app.models.event import Event
+from app.models.outbox import OutboxMessage
+from app.models.trigger import Trigger
+from app.services.event_manager import add_event, delete_old_events
+from app.services.outbox_relay import relay_batch
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def xadd(self, stream, fields, **kwargs):
+        self.commands.append((stream, fields))
+
+    def execute(self):
+        if self.redis.fail:
+            raise ConnectionError("Redis is down")
+        self.redis.streams.extend(self.commands)
+
+class FakeRedis:
+    """Records what the relay publishes"""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.streams = []
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+@pytest.fixture
+def outbox_on(monkeypatch):
+    monkeypatch.setattr(settings, "OUTBOX_ENABLED", True)
+    monkeypatch.setattr(Settings, "OUTBOX_ACTIVE", property(lambda self: self.OUTBOX_ENABLED))
+    monkeypatch.setattr(settings, "OUTBOX_STREAM_MODE", "global")
+
+def _add_trigger(db):
+    trigger = Trigger(type="api")
+    db.add(trigger)
+    db.commit()
+    return trigger
+
+def _naive(value):
+    # SQLite hands timestamps back without their UTC offset
+    return datetime.fromisoformat(value).replace(tzinfo=None)
+
+def _stage_event(db, trigger, **fields):
+    event = Event(trigger_id=trigger.id, is_test=False, **fields)
+    add_event(db, event)
+    db.commit()
+    return event
+
+def test_add_event_writes_outbox_row_with_event_time(db, outbox_on):
+    trigger = _add_trigger(db)
+    triggered_at = datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc)
+
+    event = _stage_event(db, trigger, payload={"a": 1}, triggered_at=triggered_at)
+
+    message = db.query(OutboxMessage).one()
+    assert message.event_id == event.id
+    assert message.trigger_id == trigger.id
+    assert message.stream == "events"
+    assert message.payload == {"payload": {"a": 1}, "is_test": False, "triggered_at": triggered_at.isoformat()}
+
+def test_add_event_stamps_time_when_missing(db, outbox_on):
+    event = _stage_event(db, _add_trigger(db))
+
+    assert event.triggered_at is not None
+    assert _naive(db.query(OutboxMessage).one().payload["triggered_at"]) == event.triggered_at.replace(tzinfo=None)
+
+def test_add_event_per_trigger_stream(db, outbox_on, monkeypatch):
+    monkeypatch.setattr(settings, "OUTBOX_STREAM_MODE", "per_trigger")
+    trigger = _add_trigger(db)
+
+    _stage_event(db, trigger)
+
+    assert db.query(OutboxMessage).one().stream == f"events:{trigger.id}"
+
+def test_add_event_without_outbox_writes_no_row(db, monkeypatch):
+    monkeypatch.setattr(settings, "OUTBOX_ENABLED", False)
+
+    _stage_event(db, _add_trigger(db))
+
+    assert db.query(OutboxMessage).count() == 0
+    assert db.query(Event).count() == 1
+
+def test_relay_publishes_and_deletes_in_order(db, outbox_on):
+    trigger = _add_trigger(db)
+    events = [_stage_event(db, trigger, payload={"n": n}) for n in range(3)]
+    redis = FakeRedis()
+
+    assert relay_batch(db, redis, batch_size=2) == 2
+    assert relay_batch(db, redis, batch_size=2) == 1
+    assert relay_batch(db, redis, batch_size=2) == 0
+
+    assert db.query(OutboxMessage).count() == 0
+    assert [fields["event_id"] for _, fields in redis.streams] == [str(event.id) for event in events]
+    stream, fields = redis.streams[0]
+    assert stream == "events"
+    assert fields["trigger_id"] == str(trigger.id)
+    assert _naive(fields["triggered_at"]) == events[0].triggered_at.replace(tzinfo=None)
+    assert fields["is_test"] == "0"
+    assert json.loads(fields["payload"]) == {"n": 0}
+
+def test_relay_keeps_rows_when_publish_fails(db, outbox_on):
+    _stage_event(db, _add_trigger(db))
+
+    with pytest.raises(ConnectionError):
+        relay_batch(db, FakeRedis(fail=True))
+
+    assert db.query(OutboxMessage).count() == 1
+    redis = FakeRedis()
+    assert relay_batch(db, redis) == 1
+    assert len(redis.streams) == 1
+
+def test_relay_falls_back_to_created_at_for_legacy_rows(db):
+    created_at = datetime(2026, 1, 1, 12, 0)
+    db.add(OutboxMessage(
+        event_id=uuid.uuid4(), trigger_id=uuid.uuid4(), stream="events",
+        payload={"payload": None, "is_test": True}, created_at=created_at
+    ))
+    db.commit()
+    redis = FakeRedis()
+
+    relay_batch(db, redis)
+
+    _, fields = redis.streams[0]
+    assert fields["triggered_at"] == created_at.isoformat()
+    assert fields["is_test"] == "1"
+
+def test_retention_drops_undelivered_messages_past_retention(db):
+    now = datetime.utcnow()
+    for age in (settings.OUTBOX_RETENTION_HOURS + 1, 1):
+        db.add(OutboxMessage(
+            event_id=uuid.uuid4(), trigger_id=uuid.uuid4(), stream="events",
+            payload={}, created_at=now - timedelta(hours=age)
+        ))
+    db.commit()
+
+    asyncio.run(delete_old_events())
+
+    db.expire_all()
+    remaining = db.query(OutboxMessage).all()
+    assert len(remaining) == 1
+    assert remaining[0].created_at > now - timedelta(hours=2)
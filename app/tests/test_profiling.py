@@ -0,0 +1,43 @@
+import os
+import pytest
+from app.core.config import settings
+from app.core.profiling import _profile_mode, _rotate
+from app.core.security import create_access_token
+
+@pytest.fixture(autouse=True)
+def profiling_settings(monkeypatch):
+    monkeypatch.setattr(settings, "PROFILING_SAMPLE_RATE", 0.0)
+    monkeypatch.setattr(settings, "PROFILING_TOKEN", "s3cret")
+
+def _scope(*headers):
+    return {"type": "http", "headers": [(name.encode(), value.encode()) for name, value in headers]}
+
+def test_header_is_ignored_without_credentials():
+    assert _profile_mode(_scope(("x-profile", "cpu"))) is None
+
+def test_header_is_ignored_with_wrong_token():
+    assert _profile_mode(_scope(("x-profile", "cpu"), ("x-profile-token", "guess"))) is None
+
+def test_header_is_ignored_when_no_token_is_configured(monkeypatch):
+    monkeypatch.setattr(settings, "PROFILING_TOKEN", "")
+    assert _profile_mode(_scope(("x-profile", "cpu"), ("x-profile-token", ""))) is None
+
+def test_header_is_honored_with_profiling_token():
+    assert _profile_mode(_scope(("x-profile", "cpu"), ("x-profile-token", "s3cret"))) == "cpu"
+
+def test_header_is_honored_for_authenticated_user():
+    token = create_access_token({"sub": "admin"})
+    assert _profile_mode(_scope(("x-profile", "1"), ("authorization", f"Bearer {token}"))) == "sql"
+
+def test_header_is_ignored_with_invalid_bearer_token():
+    assert _profile_mode(_scope(("x-profile", "1"), ("authorization", "Bearer not-a-jwt"))) is None
+
+def test_rotate_keeps_newest_profiles(tmp_path):
+    names = [f"20260101T0000{second:02d}000000-GET-root.folded" for second in range(5)]
+    for name in names:
+        (tmp_path / name).write_text("main 1\n")
+    (tmp_path / "notes.txt").write_text("")
+
+    _rotate(str(tmp_path), 2)
+
+    assert sorted(os.listdir(tmp_path)) == sorted(names[-2:] + ["notes.txt"])
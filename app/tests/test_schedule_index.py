@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+from croniter import croniter
+from app.models.trigger import Trigger
+from app.services.schedule_index import _pattern_offsets, next_fire_time, upcoming_firings
+
+PATTERNS = [
+    "* * * * *",
+    "*/7 * * * *",
+    "30 2 * * *",
+    "*/15 9-17 * * 1-5",
+    "0 0 * * 0",
+    "0 0 * * 7",
+    # A restricted day-of-month and day-of-week fire on either
+    "0 12 1 * 1",
+    "15 6 13 * 5",
+    "0 0 1,15 * 6,7",
+    "5 4 29 2 *",
+    "0 0 31 * *",
+    "0 */6 * 1,3 *",
+    # croniter walks these
+    "0 0 L * *",
+    "0 9 * * 1#2",
+]
+
+STARTS = [
+    datetime(2026, 1, 31, 22, 17, tzinfo=timezone.utc),
+    datetime(2026, 2, 28, 23, 59, tzinfo=timezone.utc),
+    datetime(2028, 2, 28, 0, 0, tzinfo=timezone.utc),
+    datetime(2026, 12, 31, 23, 0, tzinfo=timezone.utc),
+]
+
+def _croniter_offsets(pattern, start, minutes):
+    iterator = croniter(pattern, start - timedelta(seconds=1))
+    end = start + timedelta(minutes=minutes)
+    offsets = []
+    while (fire_at := iterator.get_next(datetime)) < end:
+        offsets.append(int((fire_at - start).total_seconds() // 60))
+    return offsets
+
+@pytest.mark.parametrize("pattern", PATTERNS)
+@pytest.mark.parametrize("start", STARTS)
+def test_pattern_offsets_match_croniter(pattern, start):
+    for minutes in (1, 90, 1440, 3 * 1440):
+        assert _pattern_offsets(pattern, start, minutes) == _croniter_offsets(pattern, start, minutes)
+
+def test_dom_dow_fire_on_either():
+    # 2026-06-01 is a Monday, so day 1 and each Monday of June both count
+    start = datetime(2026, 6, 1, tzinfo=timezone.utc)
+    days = {
+        (start + timedelta(minutes=offset)).day
+        for offset in _pattern_offsets("0 12 1,20 * 1", start, 30 * 1440)
+    }
+    assert days == {1, 8, 15, 20, 22, 29}
+
+def test_upcoming_firings_counts_shared_patterns(db):
+    now = datetime(2026, 3, 2, 10, 0, 30, tzinfo=timezone.utc)
+    for pattern in ("*/30 * * * *", "*/30 * * * *", "0 11 * * *"):
+        trigger = Trigger(type="scheduled", recurring=True, recurring_pattern=pattern, is_active=True)
+        trigger.next_fire_at = next_fire_time(trigger, now)
+        db.add(trigger)
+    db.commit()
+
+    report = upcoming_firings(db, 120, now)
+
+    assert report["start"] == datetime(2026, 3, 2, 10, 1, tzinfo=timezone.utc)
+    counts = {bucket["minute"].strftime("%H:%M"): bucket["count"] for bucket in report["histogram"]}
+    assert counts == {"10:30": 2, "11:00": 3, "11:30": 2, "12:00": 2}
+    assert report["total"] == 9
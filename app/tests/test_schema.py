@@ -0,0 +1,30 @@
+import pytest
+from sqlalchemy import create_engine, text
+from app.core import schema
+from app.core.database import Base
+
+@pytest.fixture
+def fresh_engine(tmp_path, monkeypatch):
+    fresh = create_engine(f"sqlite:///{tmp_path / 'schema.db'}")
+    monkeypatch.setattr(schema, "engine", fresh)
+    yield fresh
+    fresh.dispose()
+
+def test_created_schema_passes_check(fresh_engine):
+    schema.create_schema()
+
+    schema.check_schema()
+
+def test_unversioned_database_fails_check(fresh_engine):
+    Base.metadata.create_all(bind=fresh_engine)
+
+    with pytest.raises(RuntimeError, match="no revision.*alembic upgrade head"):
+        schema.check_schema()
+
+def test_older_revision_fails_check(fresh_engine):
+    schema.create_schema()
+    with fresh_engine.begin() as connection:
+        connection.execute(text("UPDATE alembic_version SET version_num = '0004'"))
+
+    with pytest.raises(RuntimeError, match="at 0004"):
+        schema.check_schema()
@@ -0,0 +1,121 @@
+"""Worker process: owns scheduling, trigger firing and retention.
+
+    python -m app.worker
+
+Run API replicas with RUN_SCHEDULER=false and scale workers independently.
+Every worker pops jobs handed off by the API from the Redis job queue. The
+jobstore is shared, so only the worker holding the scheduler leader lock
+fires scheduled jobs; the others keep their scheduler paused and take over
+when the lock expires.
+"""
+import asyncio
+import logging
+import os
+import signal
+import socket
+from .core.config import settings
+from .core.schema import check_schema, create_schema
+from .services.firing_stats import run_checkpoints
+from .services.job_queue import consume, listen_for_wakeups, redis_client, requeue_jobs, track_consumers
+from .services.scheduler import scheduler, init_scheduler, resume_firing
+
+logger = logging.getLogger(__name__)
+
+LEADER_KEY = "scheduler:leader"
+
+# Names this process in the leader lock and in the job queue
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+# Only extend or release the lock while we still own it
+RENEW_LEADERSHIP = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('expire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+RELEASE_LEADERSHIP = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+async def lead_scheduler(stop: asyncio.Event):
+    """Run the scheduler while holding the leader lock, pause it otherwise"""
+    ttl = settings.SCHEDULER_LEADER_TTL
+    leading = False
+    if redis_client is None:
+        # Single-node deployment without Redis: this worker is the only one
+        await resume_firing()
+        await stop.wait()
+        return
+    try:
+        while not stop.is_set():
+            try:
+                if leading:
+                    leading = bool(await redis_client.eval(RENEW_LEADERSHIP, 1, LEADER_KEY, WORKER_ID, ttl))
+                    if not leading:
+                        logger.warning("Lost scheduler leadership, pausing")
+                        scheduler.pause()
+                elif await redis_client.set(LEADER_KEY, WORKER_ID, nx=True, ex=ttl):
+                    logger.info("Acquired scheduler leadership")
+                    leading = True
+                    await resume_firing()
+            except Exception:
+                logger.exception("Scheduler leadership check failed")
+                if leading:
+                    # The lock may expire before we can renew it again, and
+                    # another worker would take over: stop firing until we
+                    # hold the lock again
+                    leading = False
+                    scheduler.pause()
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=ttl / 3)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        if leading:
+            try:
+                await redis_client.eval(RELEASE_LEADERSHIP, 1, LEADER_KEY, WORKER_ID)
+            except Exception:
+                # The lock expires on its own
+                logger.exception("Releasing scheduler leadership failed")
+
+async def poll_jobstore(stop: asyncio.Event):
+    """Re-read the jobstore periodically in case a wakeup message was missed"""
+    while not stop.is_set():
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=settings.WORKER_SCHEDULER_POLL_SECONDS)
+        except asyncio.TimeoutError:
+            scheduler.wakeup()
+
+async def main():
+    if settings.AUTO_CREATE_SCHEMA:
+        create_schema()
+    check_schema()
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    await init_scheduler(paused=True)
+    if redis_client is not None:
+        # Jobs claimed under this name by a previous process never finished
+        await requeue_jobs(WORKER_ID)
+    logger.info("Worker started with %d consumers", settings.WORKER_CONCURRENCY)
+    try:
+        await asyncio.gather(
+            lead_scheduler(stop),
+            poll_jobstore(stop),
+            listen_for_wakeups(stop),
+            run_checkpoints(stop),
+            track_consumers(stop, WORKER_ID),
+            *(consume(stop, WORKER_ID) for _ in range(settings.WORKER_CONCURRENCY))
+        )
+    finally:
+        scheduler.shutdown()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
@@ -0,0 +1,122 @@
+"""Measure time-to-first-request and time-to-ready of the API.
+
+Seeds N recurring triggers (and their scheduler jobs) into the database
+pointed at by DATABASE_URL, then boots uvicorn and polls /health and
+/ready until they answer. While waiting for /ready it also reports the
+slowest /health response, i.e. how long the event loop stalled:
+
+    python scripts/measure_startup.py --triggers 50000
+    AUTO_CREATE_SCHEMA=false LAZY_SCHEDULER_START=true python scripts/measure_startup.py --skip-seed
+
+Run it once per startup mode against the same seeded database to compare.
+--overdue-minutes seeds the jobs as if the scheduler had been down that
+long, which is the worst case for hydration. Startup catches up on those
+firings, so reseed between runs.
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+async def seed(count: int, overdue_minutes: int = 0):
+    from app.core.database import Base, SessionLocal, engine
+    from app.models.trigger import Trigger
+    from app.services.event_manager import create_event_from_trigger
+    from app.services.scheduler import scheduler
+
+    Base.metadata.create_all(bind=engine)
+    # A paused scheduler writes jobs straight to the jobstore without running them
+    scheduler.start(paused=True)
+    due_at = None
+    if overdue_minutes:
+        due_at = datetime.now(timezone.utc).replace(second=0, microsecond=0) - timedelta(minutes=overdue_minutes)
+    db = SessionLocal()
+    try:
+        batch = []
+        for i in range(count):
+            trigger_id = uuid.uuid4()
+            pattern = f"{i % 60} * * * *"
+            batch.append({
+                "id": trigger_id,
+                "type": "scheduled",
+                "recurring": True,
+                "recurring_pattern": pattern,
+                "is_active": True,
+                "next_fire_at": due_at,
+            })
+            minute, hour, day, month, day_of_week = pattern.split()
+            scheduler.add_job(
+                create_event_from_trigger, 'cron', args=[str(trigger_id)],
+                minute=minute, hour=hour, day=day, month=month,
+                day_of_week=day_of_week, id=str(trigger_id),
+                **({"next_run_time": due_at} if due_at else {})
+            )
+            if len(batch) == 1000:
+                db.bulk_insert_mappings(Trigger, batch)
+                db.commit()
+                batch = []
+        if batch:
+            db.bulk_insert_mappings(Trigger, batch)
+            db.commit()
+    finally:
+        db.close()
+        scheduler.shutdown(wait=False)
+
+def wait_for(client: httpx.Client, url: str, started: float, timeout: float, probe: str = None) -> tuple:
+    """Seconds until url answers 200, and the slowest answer from probe meanwhile"""
+    slowest = 0.0
+    while time.perf_counter() - started < timeout:
+        try:
+            if probe:
+                sent = time.perf_counter()
+                client.get(probe)
+                slowest = max(slowest, time.perf_counter() - sent)
+            if client.get(url).status_code == 200:
+                return time.perf_counter() - started, slowest
+        except httpx.TransportError:
+            pass
+        time.sleep(0.01)
+    raise TimeoutError(f"{url} did not answer within {timeout}s")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--triggers", type=int, default=50000)
+    parser.add_argument("--skip-seed", action="store_true")
+    parser.add_argument("--overdue-minutes", type=int, default=0)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=300.0)
+    args = parser.parse_args()
+
+    if not args.skip_seed:
+        started = time.perf_counter()
+        asyncio.run(seed(args.triggers, args.overdue_minutes))
+        print(f"seeded {args.triggers} triggers in {time.perf_counter() - started:.1f}s")
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    started = time.perf_counter()
+    server = subprocess.Popen([
+        sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port)
+    ])
+    try:
+        with httpx.Client(timeout=args.timeout) as client:
+            first_request, _ = wait_for(client, f"{base_url}/health", started, args.timeout)
+            ready, stall = wait_for(client, f"{base_url}/ready", started, args.timeout, f"{base_url}/health")
+    finally:
+        server.terminate()
+        server.wait()
+
+    print(f"AUTO_CREATE_SCHEMA={os.getenv('AUTO_CREATE_SCHEMA', 'true')} "
+          f"LAZY_SCHEDULER_START={os.getenv('LAZY_SCHEDULER_START', 'false')}")
+    print(f"time to first request: {first_request:.2f}s")
+    print(f"time to ready:         {ready:.2f}s")
+    print(f"slowest /health until ready: {stall:.2f}s")
+
+if __name__ == "__main__":
+    main()